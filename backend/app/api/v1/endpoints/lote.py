@@ -1,29 +1,43 @@
 """Rotas HTTP de lançamento de lote — sem lógica de negócio."""
 from __future__ import annotations
 
+import csv
 from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Path, Query
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Path,
+    Query,
+    UploadFile,
+)
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import engine, get_session
+from app.core.exceptions import EnvioLoteInvalidoError, LoteProcessamentoError
+from app.database import get_session
 from app.models.protocolo import Protocolo
 from app.repositories.protocolo_repository import ProtocoloRepository
-from app.schemas.lote import LoteContabilCreate
-from app.services.lote_processor import LoteProcessor
+from app.repositories.resumo_protocolo_repository import ResumoProtocoloRepository
+from app.schemas.lote import EnvioLoteManifesto, LoteContabilCreate, PreflightRequest
+from app.services.background import processar_em_background
+from app.services.envio_lote import (
+    NOME_MANIFESTO_ZIP,
+    EnvioLoteService,
+    extrair_zip,
+    processar_envio,
+)
+from app.services.preflight import PreflightService
+from app.services.retencao import RetencaoService
 
 router = APIRouter()
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
 
 
-async def _run_background(protocolo_id: int, arquivo: str, layout: str) -> None:
-    from sqlalchemy.orm import sessionmaker
-
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    async with async_session() as db:
-        await LoteProcessor(db).processar(protocolo_id, arquivo, layout)
-
-
 @router.post("/lancamento_lote_contabil")
 async def criar_lote(
     lote: LoteContabilCreate, db: SessionDep, bg: BackgroundTasks
@@ -31,6 +45,15 @@ async def criar_lote(
     repo = ProtocoloRepository(db)
     if await repo.buscar_por_numero(lote.protocolo):
         raise HTTPException(400, "Protocolo já existente.")
+    if lote.validar_antes:
+        relatorio = await _preflight(
+            db, lote.cnpj, lote.periodo, lote.layout_nome, lote.arquivo_base64
+        )
+        if not relatorio["valido"]:
+            raise HTTPException(422, relatorio)
+        if not relatorio["completo"]:
+            # Sem ler o arquivo inteiro não dá para garantir o período.
+            raise HTTPException(422, {**relatorio, "erro": "Arquivo não validado por completo."})
 
     novo = await repo.salvar(
         Protocolo(
@@ -45,10 +68,109 @@ async def criar_lote(
             status="PENDING",
         )
     )
-    bg.add_task(_run_background, novo.id, lote.arquivo_base64, lote.layout_nome)
+    bg.add_task(processar_em_background, novo.id, lote.arquivo_base64, lote.layout_nome)
     return {"sucesso": True, "protocolo": lote.protocolo}
 
 
+@router.post("/lancamento_lote_contabil/preflight")
+async def preflight_lote(payload: PreflightRequest, db: SessionDep) -> dict:
+    """Valida período e contas do arquivo sem criar protocolo nem enfileirar."""
+    return await _preflight(
+        db,
+        payload.cnpj,
+        payload.periodo,
+        payload.layout_nome,
+        payload.arquivo_base64,
+        payload.max_erros,
+        payload.orcamento_ms / 1000,
+    )
+
+
+async def _preflight(db: AsyncSession, *args) -> dict:
+    try:
+        return await PreflightService(db).executar(*args)
+    except LoteProcessamentoError as e:
+        raise HTTPException(400, str(e))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(400, f"Arquivo ilegível: {e}")
+    except Exception as e:
+        # Importado só aqui: o calamine fica fora da partida do app.
+        from python_calamine import CalamineError
+
+        if isinstance(e, CalamineError):
+            raise HTTPException(400, f"Arquivo ilegível: {e}")
+        raise
+
+
+@router.post("/lancamento_lote_contabil/envio")
+async def criar_envio(
+    db: SessionDep,
+    bg: BackgroundTasks,
+    arquivos: Annotated[list[UploadFile], File(description="Planilhas ou um único .zip")],
+    manifesto: Annotated[str | None, Form(description="JSON; opcional se o ZIP tiver manifest.json")] = None,
+) -> dict:
+    """Cria um envio pai com um protocolo por arquivo e processa os filhos em paralelo."""
+    conteudos: dict[str, bytes] = {}
+    try:
+        for upload in arquivos:
+            dados = await upload.read()
+            if (upload.filename or "").lower().endswith(".zip"):
+                conteudos.update(extrair_zip(dados))
+            else:
+                conteudos[upload.filename or ""] = dados
+        manifesto_zip = conteudos.pop(NOME_MANIFESTO_ZIP, None)
+        manifesto_json = manifesto or (manifesto_zip or b"").decode("utf-8-sig")
+        if not manifesto_json:
+            raise EnvioLoteInvalidoError("Manifesto não informado.")
+        dados_envio = EnvioLoteManifesto.model_validate_json(manifesto_json)
+        _, protocolos = await EnvioLoteService(db).criar(dados_envio, conteudos)
+    except ValidationError as e:
+        raise HTTPException(422, e.errors(include_url=False, include_context=False))
+    except (EnvioLoteInvalidoError, UnicodeDecodeError) as e:
+        raise HTTPException(400, str(e))
+
+    bg.add_task(
+        processar_envio,
+        [(p.id, p.arquivo_base64_raw) for p in protocolos],
+        dados_envio.layout_nome,
+    )
+    return {
+        "sucesso": True,
+        "envio": dados_envio.envio,
+        "protocolos": [p.numero_protocolo for p in protocolos],
+    }
+
+
+@router.get("/lancamento_lote_contabil/envio/{numero_envio}")
+async def consultar_envio(
+    numero_envio: Annotated[str, Path(description="Identificador do envio")],
+    db: SessionDep,
+) -> dict:
+    status = await EnvioLoteService(db).status(numero_envio)
+    if not status:
+        raise HTTPException(404, "Envio não encontrado.")
+    return status
+
+
+@router.delete("/lancamento_lote_contabil/envio/{numero_envio}")
+async def deletar_envio(
+    numero_envio: Annotated[str, Path(description="Identificador do envio")],
+    db: SessionDep,
+) -> dict:
+    """Exclui o envio e seus protocolos filhos; o envio pode ser reenviado em seguida."""
+    try:
+        protocolos = await EnvioLoteService(db).excluir(numero_envio)
+    except EnvioLoteInvalidoError as e:
+        raise HTTPException(409, str(e))
+    if protocolos is None:
+        raise HTTPException(404, "Envio não encontrado.")
+    return {
+        "sucesso": True,
+        "mensagem": f"Envio {numero_envio} excluído.",
+        "protocolos": protocolos,
+    }
+
+
 @router.get("/lancamento_lote_contabil")
 async def consultar_lote(
     db: SessionDep,
@@ -65,7 +187,7 @@ async def consultar_lote(
             "sucesso": True,
             "protocolo": p.numero_protocolo,
             "status": p.status,
-            "resultado": p.arquivo_txt_base64 if p.status == "COMPLETED" else "pendente",
+            "resultado": await RetencaoService(db).carregar_txt(p) if p.status == "COMPLETED" else "pendente",
             "error_message": p.error_message if p.status == "ERROR" else None,
         }
 
@@ -88,6 +210,26 @@ async def consultar_lote(
     raise HTTPException(400, "Informe protocolo ou cnpj.")
 
 
+@router.get("/lancamento_lote_contabil/resumo")
+async def resumo_lote(
+    db: SessionDep,
+    protocolo: Annotated[str, Query(description="Número do protocolo")],
+) -> dict:
+    """Totais de conciliação gravados no processamento (sem reler o arquivo)."""
+    p = await ProtocoloRepository(db).buscar_por_numero(protocolo)
+    if not p:
+        raise HTTPException(404, "Protocolo não encontrado.")
+    resumo = await ResumoProtocoloRepository(db).buscar(p.id)
+    if resumo is None:
+        raise HTTPException(409, f"Resumo indisponível para protocolo em {p.status}.")
+    return {
+        "sucesso": True,
+        "protocolo": p.numero_protocolo,
+        "status": p.status,
+        **resumo,
+    }
+
+
 @router.delete("/lancamento_lote_contabil/{numero_protocolo}")
 async def deletar_protocolo(
     numero_protocolo: Annotated[str, Path(description="Número do protocolo")],
@@ -99,6 +241,14 @@ async def deletar_protocolo(
         raise HTTPException(404, "Protocolo não encontrado.")
     if p.status == "PENDING":
         raise HTTPException(409, "Aguarde o processamento antes de excluir.")
+    envio = await EnvioLoteService(db).envio_do_protocolo(p.id)
+    if envio:
+        raise HTTPException(
+            409,
+            f"Protocolo faz parte do envio {envio}; o TXT mesclado ficaria incompleto. "
+            f"Exclua o envio inteiro (DELETE /api/lancamento_lote_contabil/envio/{envio}).",
+        )
+    await RetencaoService(db).remover_arquivo(p.id)
     entries_count = await repo.deletar(p)
     return {
         "sucesso": True,
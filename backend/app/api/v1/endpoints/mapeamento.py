@@ -0,0 +1,94 @@
+"""Rotas HTTP de importação/exportação em massa de mapeamentos de conta."""
+from __future__ import annotations
+
+from typing import Annotated, AsyncIterator
+
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.exceptions import ArquivoMapeamentoInvalidoError
+from app.database import engine, get_session
+from app.services.background import processar_em_background
+from app.services.mapeamento_io import (
+    MapeamentoImporter,
+    exportar_csv,
+    ler_planilha_mapeamento,
+)
+from app.services.reprocessamento import LAYOUT_PADRAO, ReprocessamentoService
+from app.services.sugestoes import historicos_pendentes, indice_sugestoes
+
+router = APIRouter()
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
+CnpjQuery = Annotated[str, Query(pattern=r"^\d{14}$")]
+
+
+@router.post("/mapeamentos/importar")
+async def importar_mapeamentos(
+    cnpj: CnpjQuery,
+    db: SessionDep,
+    bg: BackgroundTasks,
+    arquivo: Annotated[UploadFile, File(description="CSV ou XLSX: conta_cliente;conta_contabilidade;tipo")],
+    dry_run: Annotated[bool, Query()] = False,
+    encoding: Annotated[str, Query()] = "utf-8-sig",
+) -> dict:
+    """Upsert em lote dos mapeamentos do arquivo; reprocessa protocolos liberados."""
+    try:
+        importer = MapeamentoImporter(db)
+        relatorio = await importer.importar(
+            cnpj, ler_planilha_mapeamento(arquivo.file, encoding), dry_run=dry_run
+        )
+    except (ArquivoMapeamentoInvalidoError, UnicodeDecodeError) as e:
+        raise HTTPException(400, str(e))
+
+    if not dry_run:
+        service = ReprocessamentoService(db)
+        liberados = await service.protocolos_liberados(importer.protocolos_afetados)
+        for p in await service.preparar(liberados):
+            bg.add_task(processar_em_background, p.id, p.arquivo_base64_raw, LAYOUT_PADRAO)
+            relatorio.protocolos_reprocessados.append(p.numero_protocolo)
+
+    return {"sucesso": relatorio.erro_gravacao is None, "relatorio": relatorio.como_dict()}
+
+
+@router.get("/mapeamentos/exportar")
+async def exportar_mapeamentos(cnpj: CnpjQuery) -> StreamingResponse:
+    """CSV com todos os mapeamentos do CNPJ, no mesmo formato da importação."""
+
+    async def _conteudo() -> AsyncIterator[str]:
+        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with async_session() as db:
+            async for bloco in exportar_csv(db, cnpj):
+                yield bloco
+
+    return StreamingResponse(
+        _conteudo(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="mapeamentos_{cnpj}.csv"'},
+    )
+
+
+@router.get("/mapeamentos/sugestoes")
+async def sugerir_mapeamento(
+    cnpj: CnpjQuery,
+    tipo: Annotated[str, Query(pattern="^(DEBITO|CREDITO)$")],
+    conta_cliente: Annotated[str, Query(min_length=1)],
+    db: SessionDep,
+    q: Annotated[str, Query(description="Início da conta contábil digitada")] = "",
+    protocolo_id: Annotated[int | None, Query(description="Usa os históricos em staging")] = None,
+    limite: Annotated[int, Query(ge=1, le=50)] = 10,
+) -> dict:
+    """Contas contábeis sugeridas para uma conta cliente, a partir do índice em memória."""
+    historicos = (
+        await historicos_pendentes(db, protocolo_id, tipo, conta_cliente)
+        if protocolo_id
+        else []
+    )
+    return {
+        "sucesso": True,
+        "indice_pronto": indice_sugestoes.pronto,
+        "sugestoes": indice_sugestoes.sugerir(
+            cnpj, tipo, conta_cliente, q=q, historicos=historicos, limite=limite
+        ),
+    }
@@ -1,48 +1,51 @@
 """Rotas HTTP de pendências de mapeamento de contas."""
 from __future__ import annotations
 
+from collections import defaultdict
 from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import engine, get_session
-from app.models.account_mapping import AccountMapping
+from app.database import get_session
 from app.models.protocolo import Protocolo
 from app.models.staging_entry import StagingEntry
 from app.repositories.account_mapping_repository import AccountMappingRepository
+from app.repositories.pendencia_conta_repository import PendenciaContaRepository
 from app.repositories.protocolo_repository import ProtocoloRepository
 from app.schemas.pendencia import ResolvePendenciaRequest
-from app.services.lote_processor import LoteProcessor
+from app.services.background import processar_em_background
+from app.services.reprocessamento import LAYOUT_PADRAO, ReprocessamentoService
+from app.services.sugestoes import (
+    historicos_pendentes,
+    historicos_por_conta,
+    indice_sugestoes,
+)
 
 router = APIRouter()
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
 
 
-async def _run_background(protocolo_id: int, arquivo: str, layout: str) -> None:
-    from sqlalchemy.orm import sessionmaker
-
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    async with async_session() as db:
-        await LoteProcessor(db).processar(protocolo_id, arquivo, layout)
-
-
 @router.get("/pendencias")
 async def listar_pendencias(db: SessionDep) -> dict:
     """Lista todos os StagingEntry de protocolos com status WAITING_MAPPING."""
     repo = ProtocoloRepository(db)
     protocolos = await repo.buscar_por_status("WAITING_MAPPING")
 
+    # Uma consulta para as entries de todos os protocolos (evita N+1).
+    entries_por_protocolo: dict[int, list[StagingEntry]] = defaultdict(list)
+    if protocolos:
+        entries = await db.execute(
+            select(StagingEntry)
+            .where(StagingEntry.protocolo_id.in_([p.id for p in protocolos]))
+            .order_by(StagingEntry.id)
+        )
+        for e in entries.scalars():
+            entries_por_protocolo[e.protocolo_id].append(e)
+
     pendencias_list = []
     for p in protocolos:
-        entries = list(
-            (
-                await db.execute(
-                    select(StagingEntry).where(StagingEntry.protocolo_id == p.id)
-                )
-            ).scalars().all()
-        )
         pendencias_list.append(
             {
                 "protocolo_id": p.id,
@@ -58,7 +61,7 @@ async def listar_pendencias(db: SessionDep) -> dict:
                         "historico": e.historico,
                         "cod_historico": e.cod_historico,
                     }
-                    for e in entries
+                    for e in entries_por_protocolo[p.id]
                 ],
             }
         )
@@ -66,13 +69,45 @@ async def listar_pendencias(db: SessionDep) -> dict:
     return {"sucesso": True, "pendencias": pendencias_list}
 
 
+@router.get("/pendencias/{protocolo_id}/sugestoes")
+async def sugerir_pendencias(
+    protocolo_id: int,
+    db: SessionDep,
+    limite: Annotated[int, Query(ge=1, le=50)] = 5,
+) -> dict:
+    """Sugestões para todas as contas pendentes do protocolo numa só chamada."""
+    protocolo = await ProtocoloRepository(db).buscar_por_id(protocolo_id)
+    if not protocolo:
+        raise HTTPException(404, "Protocolo não encontrado.")
+    contas = await PendenciaContaRepository(db).contas_pendentes(protocolo_id)
+    historicos = await historicos_por_conta(db, protocolo_id)
+    return {
+        "sucesso": True,
+        "indice_pronto": indice_sugestoes.pronto,
+        "sugestoes": [
+            {
+                "tipo": tipo,
+                "conta_cliente": conta,
+                "sugestoes": indice_sugestoes.sugerir(
+                    protocolo.cnpj,
+                    tipo,
+                    conta,
+                    historicos=historicos.get((tipo, conta), ()),
+                    limite=limite,
+                ),
+            }
+            for tipo, conta in sorted(contas)
+        ],
+    }
+
+
 @router.post("/pendencias/resolver")
 async def resolver_pendencia(
     payload: ResolvePendenciaRequest,
     db: SessionDep,
     bg: BackgroundTasks,
 ) -> dict:
-    """Persiste mapeamento de conta e reprocessa se todas as pendências forem resolvidas."""
+    """Persiste mapeamento de conta e reprocessa todo protocolo que ele desbloquear."""
     mapping_repo = AccountMappingRepository(db)
     await mapping_repo.salvar_ou_atualizar(
         cnpj_empresa=payload.cnpj_empresa,
@@ -81,55 +116,43 @@ async def resolver_pendencia(
         tipo=payload.tipo,
     )
 
+    indice_sugestoes.registrar(
+        payload.cnpj_empresa, payload.tipo, payload.conta_cliente, payload.conta_contabilidade
+    )
+
     proto_repo = ProtocoloRepository(db)
     protocolo = await proto_repo.buscar_por_id(payload.protocolo_id)
     if not protocolo:
         raise HTTPException(404, "Protocolo não encontrado.")
+    indice_sugestoes.aprender_historicos(
+        payload.tipo,
+        payload.conta_contabilidade,
+        await historicos_pendentes(db, protocolo.id, payload.tipo, payload.conta_cliente),
+    )
 
-    entries = list(
-        (
-            await db.execute(
-                select(StagingEntry).where(
-                    StagingEntry.protocolo_id == payload.protocolo_id
-                )
-            )
-        ).scalars().all()
+    # Índice reverso: todos os protocolos bloqueados por esta conta, numa consulta.
+    indice = PendenciaContaRepository(db)
+    afetados = await indice.resolver_contas(
+        payload.cnpj_empresa, payload.tipo, [payload.conta_cliente]
     )
+    afetados.add(protocolo.id)
+
+    service = ReprocessamentoService(db)
+    liberados = await service.preparar(await service.protocolos_liberados(afetados))
+    for p in liberados:
+        bg.add_task(processar_em_background, p.id, p.arquivo_base64_raw, LAYOUT_PADRAO)
 
-    contas_sem_mapa: list[str] = []
-    for entry in entries:
-        for conta_raw, tipo in [
-            (entry.conta_debito_raw, "DEBITO"),
-            (entry.conta_credito_raw, "CREDITO"),
-        ]:
-            mapeamento = (
-                await db.execute(
-                    select(AccountMapping).where(
-                        AccountMapping.cnpj_empresa == protocolo.cnpj,
-                        AccountMapping.conta_cliente == conta_raw,
-                        AccountMapping.tipo == tipo,
-                    )
-                )
-            ).scalar_one_or_none()
-            if not mapeamento:
-                contas_sem_mapa.append(f"{tipo}:{conta_raw}")
+    if protocolo in liberados:
+        return {
+            "sucesso": True,
+            "mensagem": "Todas as pendências foram resolvidas. Reprocessando o arquivo...",
+            "reprocessando": True,
+        }
 
+    contas_sem_mapa = [
+        f"{tipo}:{conta}" for tipo, conta in await indice.contas_pendentes(protocolo.id)
+    ]
     if not contas_sem_mapa:
-        if protocolo.arquivo_base64_raw:
-            for entry in entries:
-                await db.delete(entry)
-            await db.commit()
-            bg.add_task(
-                _run_background,
-                protocolo.id,
-                protocolo.arquivo_base64_raw,
-                "layout_brastelha_1",
-            )
-            return {
-                "sucesso": True,
-                "mensagem": "Todas as pendências foram resolvidas. Reprocessando o arquivo...",
-                "reprocessando": True,
-            }
         return {
             "sucesso": True,
             "mensagem": "Mapeamento salvo. Arquivo original não disponível para reprocessamento.",
@@ -138,7 +161,7 @@ async def resolver_pendencia(
 
     return {
         "sucesso": True,
-        "mensagem": f"Mapeamento salvo. Ainda restam {len(set(contas_sem_mapa))} conta(s) sem mapeamento.",
+        "mensagem": f"Mapeamento salvo. Ainda restam {len(contas_sem_mapa)} conta(s) sem mapeamento.",
         "reprocessando": False,
-        "contas_pendentes": list(set(contas_sem_mapa)),
+        "contas_pendentes": contas_sem_mapa,
     }
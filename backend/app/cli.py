@@ -0,0 +1,171 @@
+"""Linha de comando para tarefas administrativas.
+
+Uso:
+    python -m app.cli importar-mapeamentos <cnpj> <arquivo> [--dry-run]
+    python -m app.cli exportar-mapeamentos <cnpj> [saida.csv]
+    python -m app.cli retencao [--orcamento 5] [--vacuum-completo]
+    python -m app.cli layout-abas <layout> [padrao ...] [--limpar]
+    python -m app.cli layout-csv <layout> [--delimitador ";"] [--decimal virgula|ponto|auto] [--encoding cp1252]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.exceptions import LayoutNaoEncontradoError
+from app.database import engine, init_db
+from app.models.layout_excel_csv import LayoutExcelCsv
+from app.repositories.layout_excel_repository import LayoutExcelRepository
+from app.services.lote_processor import LoteProcessor
+from app.services.mapeamento_io import (
+    MapeamentoImporter,
+    exportar_csv,
+    ler_planilha_mapeamento,
+)
+from app.services.reprocessamento import LAYOUT_PADRAO, ReprocessamentoService
+from app.services.retencao import RetencaoService, vacuum_completo
+
+
+async def importar_mapeamentos(args: argparse.Namespace) -> None:
+    """Importa o arquivo e reprocessa, em linha, os protocolos liberados."""
+    await init_db()
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as db:
+        importer = MapeamentoImporter(db)
+        with open(args.arquivo, "rb") as arquivo:
+            relatorio = await importer.importar(
+                args.cnpj,
+                ler_planilha_mapeamento(arquivo, args.encoding),
+                dry_run=args.dry_run,
+            )
+        if not args.dry_run:
+            service = ReprocessamentoService(db)
+            liberados = await service.protocolos_liberados(importer.protocolos_afetados)
+            for p in await service.preparar(liberados):
+                await LoteProcessor(db).processar(p.id, p.arquivo_base64_raw, LAYOUT_PADRAO)
+                relatorio.protocolos_reprocessados.append(p.numero_protocolo)
+    print(json.dumps(relatorio.como_dict(), ensure_ascii=False, indent=2))
+
+
+async def exportar_mapeamentos(args: argparse.Namespace) -> None:
+    await init_db()
+    saida = open(args.saida, "w", encoding="utf-8", newline="") if args.saida else sys.stdout
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with async_session() as db:
+            async for bloco in exportar_csv(db, args.cnpj):
+                saida.write(bloco)
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+
+async def retencao(args: argparse.Namespace) -> None:
+    """Executa um passo de retenção com o orçamento informado."""
+    await init_db()
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as db:
+        resultado = await RetencaoService(db).executar_passo(args.orcamento)
+    if args.vacuum_completo:
+        await vacuum_completo()
+    print(json.dumps(resultado.como_dict(), indent=2))
+
+
+async def layout_abas(args: argparse.Namespace) -> None:
+    """Mostra ou define as abas lidas pelo layout (índice ou padrão de nome)."""
+    await init_db()
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as db:
+        repo = LayoutExcelRepository(db)
+        layout = await repo.buscar_por_nome(args.layout)
+        if not layout:
+            raise LayoutNaoEncontradoError(args.layout)
+        if args.padroes or args.limpar:
+            await repo.definir_abas(layout.id, args.padroes)
+        abas = await repo.buscar_abas(layout.id)
+    print(json.dumps({"layout": args.layout, "abas": abas or ["0"]}, ensure_ascii=False))
+
+
+async def layout_csv(args: argparse.Namespace) -> None:
+    """Mostra ou define como o layout lê CSV (o que não for informado é mantido)."""
+    await init_db()
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as db:
+        repo = LayoutExcelRepository(db)
+        layout = await repo.buscar_por_nome(args.layout)
+        if not layout:
+            raise LayoutNaoEncontradoError(args.layout)
+        opcoes = await repo.buscar_opcoes_csv(layout.id) or LayoutExcelCsv(layout_id=layout.id)
+        if args.delimitador is not None or args.decimal or args.encoding is not None:
+            if args.delimitador is not None:
+                opcoes.delimitador = args.delimitador or None
+            if args.decimal:
+                opcoes.decimal_virgula = {"virgula": True, "ponto": False}.get(args.decimal)
+            if args.encoding is not None:
+                opcoes.encoding = args.encoding or None
+            await repo.definir_opcoes_csv(opcoes)
+    print(
+        json.dumps(
+            {
+                "layout": args.layout,
+                "delimitador": opcoes.delimitador,
+                "decimal": {True: "virgula", False: "ponto"}.get(opcoes.decimal_virgula, "auto"),
+                "encoding": opcoes.encoding,
+            },
+            ensure_ascii=False,
+        )
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    imp = sub.add_parser("importar-mapeamentos", help="Importa CSV/XLSX de mapeamentos")
+    imp.add_argument("cnpj")
+    imp.add_argument("arquivo")
+    imp.add_argument("--dry-run", action="store_true", help="Apenas reporta o diff")
+    imp.add_argument("--encoding", default="utf-8-sig", help="Encoding do CSV (ex.: cp1252)")
+    imp.set_defaults(func=importar_mapeamentos)
+
+    exp = sub.add_parser("exportar-mapeamentos", help="Exporta mapeamentos em CSV")
+    exp.add_argument("cnpj")
+    exp.add_argument("saida", nargs="?", help="Arquivo de saída (padrão: stdout)")
+    exp.set_defaults(func=exportar_mapeamentos)
+
+    ret = sub.add_parser("retencao", help="Arquiva blobs antigos e faz vacuum incremental")
+    ret.add_argument("--orcamento", type=float, default=5.0, help="Segundos de trabalho")
+    ret.add_argument(
+        "--vacuum-completo",
+        action="store_true",
+        help="VACUUM completo (bloqueia o banco; converte para auto_vacuum incremental)",
+    )
+    ret.set_defaults(func=retencao)
+
+    aba = sub.add_parser("layout-abas", help="Abas da planilha lidas pelo layout")
+    aba.add_argument("layout")
+    aba.add_argument(
+        "padroes", nargs="*", help='Índice ("0") ou padrão de nome ("Semana*"), em qualquer número'
+    )
+    aba.add_argument("--limpar", action="store_true", help="Volta a ler só a primeira aba")
+    aba.set_defaults(func=layout_abas)
+
+    csv_ = sub.add_parser("layout-csv", help="Como o layout lê arquivos CSV")
+    csv_.add_argument("layout")
+    csv_.add_argument("--delimitador", help='Separador de campos ("" = detectar)')
+    csv_.add_argument(
+        "--decimal", choices=("virgula", "ponto", "auto"), help="Separador decimal do valor"
+    )
+    csv_.add_argument("--encoding", help='Ex.: cp1252 ("" = detectar)')
+    csv_.set_defaults(func=layout_csv)
+
+    args = parser.parse_args(argv)
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
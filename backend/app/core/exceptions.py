@@ -12,6 +12,20 @@ class LayoutNaoEncontradoError(LoteProcessamentoError):
         super().__init__(f"Layout '{nome}' não encontrado.")
 
 
+class AbaNaoEncontradaError(LoteProcessamentoError):
+    """Nenhuma aba da planilha corresponde às abas do layout."""
+
+    def __init__(self, padroes: list[str], abas: list[str]):
+        super().__init__(
+            f"Nenhuma aba corresponde a {', '.join(padroes)}. "
+            f"Abas da planilha: {', '.join(abas)}."
+        )
+
+
+class FormatoArquivoInvalidoError(LoteProcessamentoError):
+    """Arquivo que não é planilha nem CSV no formato do layout."""
+
+
 class PeriodoInvalidoError(LoteProcessamentoError):
     """Período no formato inválido ou fora do range."""
 
@@ -26,3 +40,11 @@ class LancamentoForaDoPeriodoError(LoteProcessamentoError):
             f"Arquivo contém {total} lançamento(s) fora do período {periodo}. "
             f"Exemplos: {detalhe}{sufixo}"
         )
+
+
+class ArquivoMapeamentoInvalidoError(Exception):
+    """Arquivo de importação de mapeamentos ilegível ou fora do formato."""
+
+
+class EnvioLoteInvalidoError(Exception):
+    """Envio com vários arquivos com manifesto ou arquivos inconsistentes."""
@@ -1,8 +1,10 @@
 import os
+import zlib
 from pathlib import Path
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex, CreateTable
 from sqlmodel import SQLModel
 
 # DATA_DIR: env var para Docker (/app/data) ou fallback para raiz do projeto (dev)
@@ -15,13 +17,63 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 DB_PATH = DATA_DIR / "database.db"
 DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
 
+_INDICES_POSTERIORES = (
+    "CREATE INDEX IF NOT EXISTS ix_stagingentry_protocolo_id ON stagingentry (protocolo_id)",
+    "CREATE INDEX IF NOT EXISTS ix_protocolo_status ON protocolo (status)",
+    # Bancos anteriores ao índice único podem ter a mesma conta mapeada mais de
+    # uma vez (gravações concorrentes): fica a usada/gravada por último.
+    "DELETE FROM accountmapping WHERE id IN ("
+    " SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+    "  PARTITION BY cnpj_empresa, tipo, conta_cliente ORDER BY last_used DESC, id DESC"
+    " ) AS ordem FROM accountmapping) WHERE ordem > 1)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_accountmapping_cnpj_tipo_conta"
+    " ON accountmapping (cnpj_empresa, tipo, conta_cliente)",
+)
+
 engine = create_async_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 
 
-async def init_db():
+def versao_esquema() -> int:
+    """Impressão digital do DDL esperado (tabelas, índices), para o PRAGMA user_version.
+
+    Muda sozinha quando um modelo ou ``_INDICES_POSTERIORES`` muda: não há
+    número de versão para esquecer de incrementar.
+    """
+    import app.models  # noqa: F401 - registra todas as tabelas no metadata
+
+    dialeto = engine.sync_engine.dialect
+    ddl = [str(CreateTable(t).compile(dialect=dialeto)) for t in SQLModel.metadata.sorted_tables]
+    ddl += [
+        str(CreateIndex(i).compile(dialect=dialeto))
+        for t in SQLModel.metadata.sorted_tables
+        for i in sorted(t.indexes, key=lambda i: i.name or "")
+    ]
+    ddl += _INDICES_POSTERIORES
+    # user_version é um inteiro de 32 bits com sinal; 0 = banco nunca inicializado.
+    return zlib.crc32("\n".join(ddl).encode()) & 0x7FFFFFFF or 1
+
+
+async def init_db() -> bool:
+    """Cria tabelas/índices e liga o WAL; True se o esquema precisou ser (re)aplicado.
+
+    Com o banco já na ``versao_esquema`` atual (todo boot sem mudança de modelo)
+    nada é executado além da leitura do ``user_version``.
+    """
+    versao = versao_esquema()
     async with engine.begin() as conn:
+        if (await conn.execute(text("PRAGMA user_version;"))).scalar() == versao:
+            return False
+        # Só tem efeito em banco novo (antes das tabelas): permite que a
+        # retenção devolva páginas livres com incremental_vacuum, sem VACUUM.
+        await conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL;"))
         await conn.run_sync(SQLModel.metadata.create_all)
+        # create_all não altera tabelas existentes: índices adicionados depois.
+        for indice in _INDICES_POSTERIORES:
+            await conn.execute(text(indice))
+        # journal_mode=WAL fica gravado no arquivo: não precisa ser refeito a cada boot.
         await conn.execute(text("PRAGMA journal_mode=WAL;"))
+        await conn.execute(text(f"PRAGMA user_version={versao};"))
+    return True
 
 
 async def get_session() -> AsyncSession:
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
@@ -6,9 +7,14 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from app.database import init_db
-from app.api.v1.endpoints import lote, pendencia
+from app.database import engine, init_db
+from app.api.v1.endpoints import lote, mapeamento, pendencia
+from app.services.reprocessamento import ReprocessamentoService
+from app.services.retencao import agendador_retencao
+from app.services.sugestoes import indice_sugestoes
 
 # FRONTEND_DIR: env var para Docker (/app/frontend) ou fallback para dev
 _dev_frontend = Path(__file__).resolve().parent.parent.parent / "frontend"
@@ -17,8 +23,29 @@ FRONTEND_DIR = Path(os.environ.get("FRONTEND_DIR") or _dev_frontend)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    if await init_db():
+        # Migração de dados de bancos anteriores ao índice de pendências: só
+        # precisa rodar quando o esquema acabou de ser criado/atualizado.
+        async with async_session() as db:
+            await ReprocessamentoService(db).indexar_pendencias_legadas()
+    sugestoes = asyncio.create_task(_construir_sugestoes(async_session))
+    retencao = None
+    if os.environ.get("RETENCAO_ATIVA", "1") != "0":
+        retencao = asyncio.create_task(agendador_retencao())
     yield
+    sugestoes.cancel()
+    if retencao:
+        retencao.cancel()
+
+
+async def _construir_sugestoes(async_session) -> None:
+    # Em segundo plano: o servidor atende enquanto o índice é carregado.
+    try:
+        async with async_session() as db:
+            await indice_sugestoes.construir(db)
+    except Exception as e:
+        print(f"❌ ERRO [sugestões]: {e}")
 
 
 app = FastAPI(title="Escritório Contábil Sorriso API", lifespan=lifespan)
@@ -34,6 +61,7 @@ app.add_middleware(
 # ── API routes (prefixo /api para não colidir com rotas do React Router) ──────
 app.include_router(lote.router, prefix="/api", tags=["Lançamentos"])
 app.include_router(pendencia.router, prefix="/api", tags=["Pendências"])
+app.include_router(mapeamento.router, prefix="/api", tags=["Mapeamentos"])
 
 # ── Assets estáticos do build React (/assets/, /favicon.svg) ─────────────────
 _assets_dir = FRONTEND_DIR / "assets"
@@ -2,5 +2,23 @@ from app.models.protocolo import Protocolo
 from app.models.staging_entry import StagingEntry
 from app.models.account_mapping import AccountMapping
 from app.models.layout_excel import LayoutExcel
+from app.models.layout_excel_aba import LayoutExcelAba
+from app.models.layout_excel_csv import LayoutExcelCsv
+from app.models.pendencia_conta import PendenciaConta
+from app.models.envio_lote import EnvioLote, EnvioLoteItem
+from app.models.protocolo_arquivado import ProtocoloArquivado
+from app.models.resumo_protocolo import ResumoProtocolo
 
-__all__ = ["Protocolo", "StagingEntry", "AccountMapping", "LayoutExcel"]
+__all__ = [
+    "Protocolo",
+    "StagingEntry",
+    "AccountMapping",
+    "LayoutExcel",
+    "LayoutExcelAba",
+    "LayoutExcelCsv",
+    "PendenciaConta",
+    "EnvioLote",
+    "EnvioLoteItem",
+    "ProtocoloArquivado",
+    "ResumoProtocolo",
+]
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class EnvioLote(SQLModel, table=True):
+    """Envio de vários arquivos de uma vez; cada arquivo vira um Protocolo filho."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    numero_envio: str = Field(index=True, unique=True)
+    cnpj: str = Field(index=True)
+    periodo: str
+    gerar_txt_unico: bool = Field(default=False)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class EnvioLoteItem(SQLModel, table=True):
+    """Vínculo envio → protocolo filho, na ordem do manifesto."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    envio_id: int = Field(foreign_key="enviolote.id", index=True)
+    protocolo_id: int = Field(foreign_key="protocolo.id", index=True)
+    nome_arquivo: str
+    ordem: int
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class LayoutExcelAba(SQLModel, table=True):
+    """Aba lida por um layout: índice ("0") ou padrão de nome ("Semana*").
+
+    Layout sem linhas aqui lê só a primeira aba.
+    """
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    layout_id: int = Field(foreign_key="layoutexcel.id", index=True)
+    padrao: str
+    ordem: int = Field(default=0)
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class LayoutExcelCsv(SQLModel, table=True):
+    """Como ler arquivos CSV enviados com o layout.
+
+    Campo None = vale a variável de ambiente (``CSV_*``) ou a detecção automática.
+    """
+
+    layout_id: int = Field(foreign_key="layoutexcel.id", primary_key=True)
+    delimitador: Optional[str] = None
+    decimal_virgula: Optional[bool] = None
+    encoding: Optional[str] = None
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class PendenciaConta(SQLModel, table=True):
+    """Índice reverso: conta sem mapeamento → protocolo WAITING_MAPPING bloqueado."""
+
+    __table_args__ = (
+        Index("ix_pendenciaconta_cnpj_tipo_conta", "cnpj_empresa", "tipo", "conta_cliente"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    protocolo_id: int = Field(foreign_key="protocolo.id", index=True)
+    cnpj_empresa: str = Field(max_length=14)
+    tipo: str  # 'DEBITO' ou 'CREDITO'
+    conta_cliente: str
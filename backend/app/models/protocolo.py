@@ -15,7 +15,7 @@ class Protocolo(SQLModel, table=True):
     codigo_matriz: int = Field(default=0)
     codigo_filial: Optional[int] = Field(default=None)
     email_destinatario: str = Field(default="")
-    status: str = Field(default="PENDING")
+    status: str = Field(default="PENDING", index=True)
     arquivo_txt_base64: Optional[str] = None
     arquivo_base64_raw: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
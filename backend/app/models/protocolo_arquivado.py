@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class ProtocoloArquivado(SQLModel, table=True):
+    """Metadados de um protocolo cujos blobs foram movidos para o arquivo morto."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    protocolo_id: int = Field(foreign_key="protocolo.id", index=True, unique=True)
+    caminho: str  # relativo a ARCHIVE_DIR
+    bytes_originais: int = Field(default=0)
+    arquivado_em: datetime = Field(default_factory=datetime.utcnow)
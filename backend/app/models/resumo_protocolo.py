@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class ResumoProtocolo(SQLModel, table=True):
+    """Totais de conciliação de um protocolo, calculados no processamento."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    protocolo_id: int = Field(foreign_key="protocolo.id", index=True, unique=True)
+    resumo_json: str
+    gerado_em: datetime = Field(default_factory=datetime.utcnow)
@@ -8,7 +8,7 @@ from sqlmodel import Field, Relationship, SQLModel
 
 class StagingEntry(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    protocolo_id: int = Field(foreign_key="protocolo.id")
+    protocolo_id: int = Field(foreign_key="protocolo.id", index=True)
     data_lancamento: str
     valor: float
     conta_debito_raw: str
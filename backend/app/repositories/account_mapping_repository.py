@@ -1,6 +1,8 @@
-from typing import Optional
+from datetime import datetime
+from typing import AsyncIterator, Optional
 
 from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.account_mapping import AccountMapping
@@ -32,18 +34,82 @@ class AccountMappingRepository:
         conta_contabilidade: str,
         tipo: str,
     ) -> AccountMapping:
-        existing = await self.buscar(cnpj_empresa, conta_cliente, tipo)
-        if existing:
-            existing.conta_contabilidade = conta_contabilidade
-            await self._db.commit()
-            return existing
-        novo = AccountMapping(
-            cnpj_empresa=cnpj_empresa,
-            conta_cliente=conta_cliente,
-            conta_contabilidade=conta_contabilidade,
-            tipo=tipo,
+        mapping = await self._db.scalar(
+            self._upsert(
+                [
+                    {
+                        "cnpj_empresa": cnpj_empresa,
+                        "conta_cliente": conta_cliente,
+                        "conta_contabilidade": conta_contabilidade,
+                        "tipo": tipo,
+                        "last_used": datetime.utcnow(),
+                    }
+                ]
+            ).returning(AccountMapping),
+            execution_options={"populate_existing": True},
         )
-        self._db.add(novo)
         await self._db.commit()
-        await self._db.refresh(novo)
-        return novo
+        return mapping
+
+    async def gravar_em_lote(
+        self, cnpj_empresa: str, tipo: str, destinos: dict[str, str]
+    ) -> None:
+        """Insere ou atualiza ``conta_cliente → conta_contabilidade`` (sem commit)."""
+        if not destinos:
+            return
+        agora = datetime.utcnow()
+        await self._db.execute(
+            self._upsert(
+                [
+                    {
+                        "cnpj_empresa": cnpj_empresa,
+                        "conta_cliente": conta,
+                        "conta_contabilidade": destino,
+                        "tipo": tipo,
+                        "last_used": agora,
+                    }
+                    for conta, destino in destinos.items()
+                ]
+            )
+        )
+
+    @staticmethod
+    def _upsert(valores: list[dict]):
+        # INSERT ... ON CONFLICT sobre ux_accountmapping_cnpj_tipo_conta: duas
+        # gravações simultâneas da mesma conta não criam linhas duplicadas.
+        stmt = insert(AccountMapping).values(valores)
+        return stmt.on_conflict_do_update(
+            index_elements=["cnpj_empresa", "tipo", "conta_cliente"],
+            set_={
+                "conta_contabilidade": stmt.excluded.conta_contabilidade,
+                "last_used": stmt.excluded.last_used,
+            },
+        )
+
+    async def buscar_em_lote(
+        self, cnpj_empresa: str, tipo: str, contas_cliente: list[str]
+    ) -> dict[str, AccountMapping]:
+        """Mapeamentos existentes das contas informadas, indexados pela conta."""
+        if not contas_cliente:
+            return {}
+        resultado = await self._db.execute(
+            select(AccountMapping).where(
+                AccountMapping.cnpj_empresa == cnpj_empresa,
+                AccountMapping.tipo == tipo,
+                AccountMapping.conta_cliente.in_(contas_cliente),
+            )
+        )
+        return {m.conta_cliente: m for m in resultado.scalars().all()}
+
+    async def iterar_por_cnpj(
+        self, cnpj_empresa: str, tamanho_lote: int = 1000
+    ) -> AsyncIterator[AccountMapping]:
+        """Percorre os mapeamentos do CNPJ sem carregar todos em memória."""
+        resultado = await self._db.stream_scalars(
+            select(AccountMapping)
+            .where(AccountMapping.cnpj_empresa == cnpj_empresa)
+            .order_by(AccountMapping.tipo, AccountMapping.conta_cliente)
+            .execution_options(yield_per=tamanho_lote)
+        )
+        async for mapping in resultado:
+            yield mapping
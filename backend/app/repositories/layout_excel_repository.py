@@ -0,0 +1,66 @@
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.layout_excel import LayoutExcel
+from app.models.layout_excel_aba import LayoutExcelAba
+from app.models.layout_excel_csv import LayoutExcelCsv
+
+
+class LayoutExcelRepository:
+    """Responsabilidade única: acesso a dados de LayoutExcel."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def buscar_por_nome(self, nome: str) -> Optional[LayoutExcel]:
+        return (
+            await self._db.execute(
+                select(LayoutExcel).where(LayoutExcel.nome == nome)
+            )
+        ).scalar_one_or_none()
+
+    async def buscar_abas(self, layout_id: int) -> list[str]:
+        """Padrões de aba do layout, na ordem cadastrada (vazio = primeira aba)."""
+        return list(
+            (
+                await self._db.execute(
+                    select(LayoutExcelAba.padrao)
+                    .where(LayoutExcelAba.layout_id == layout_id)
+                    .order_by(LayoutExcelAba.ordem)
+                )
+            ).scalars().all()
+        )
+
+    async def definir_abas(self, layout_id: int, padroes: list[str]) -> None:
+        """Substitui os padrões de aba do layout (lista vazia = primeira aba)."""
+        await self._db.execute(
+            delete(LayoutExcelAba).where(LayoutExcelAba.layout_id == layout_id)
+        )
+        self._db.add_all(
+            LayoutExcelAba(layout_id=layout_id, padrao=padrao, ordem=ordem)
+            for ordem, padrao in enumerate(padroes)
+        )
+        await self._db.commit()
+
+    async def buscar_com_opcoes_csv(
+        self, nome: str
+    ) -> tuple[Optional[LayoutExcel], Optional[LayoutExcelCsv]]:
+        """Layout e suas opções de CSV (None se não cadastradas) numa consulta."""
+        linha = (
+            await self._db.execute(
+                select(LayoutExcel, LayoutExcelCsv)
+                .outerjoin(LayoutExcelCsv, LayoutExcelCsv.layout_id == LayoutExcel.id)
+                .where(LayoutExcel.nome == nome)
+            )
+        ).first()
+        return (linha[0], linha[1]) if linha else (None, None)
+
+    async def buscar_opcoes_csv(self, layout_id: int) -> Optional[LayoutExcelCsv]:
+        return await self._db.get(LayoutExcelCsv, layout_id)
+
+    async def definir_opcoes_csv(self, opcoes: LayoutExcelCsv) -> None:
+        """Substitui as opções de CSV do layout (todos os campos None = padrão)."""
+        await self._db.merge(opcoes)
+        await self._db.commit()
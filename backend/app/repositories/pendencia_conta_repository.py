@@ -0,0 +1,77 @@
+from typing import Iterable
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.pendencia_conta import PendenciaConta
+
+
+class PendenciaContaRepository:
+    """Responsabilidade única: manter o índice conta pendente → protocolo."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def substituir(
+        self, protocolo_id: int, cnpj_empresa: str, pares: Iterable[tuple[str, str]]
+    ) -> None:
+        """Troca as pendências indexadas do protocolo por ``(tipo, conta)``.
+
+        Não faz commit: participa da transação de quem está gravando o staging.
+        """
+        await self._db.execute(
+            delete(PendenciaConta).where(PendenciaConta.protocolo_id == protocolo_id)
+        )
+        linhas = [
+            {
+                "protocolo_id": protocolo_id,
+                "cnpj_empresa": cnpj_empresa,
+                "tipo": tipo,
+                "conta_cliente": conta,
+            }
+            for tipo, conta in pares
+        ]
+        if linhas:
+            await self._db.execute(insert(PendenciaConta), linhas)
+
+    async def resolver_contas(
+        self, cnpj_empresa: str, tipo: str, contas_cliente: list[str]
+    ) -> set[int]:
+        """Remove as pendências das contas agora mapeadas e retorna os protocolos afetados."""
+        if not contas_cliente:
+            return set()
+        filtro = (
+            PendenciaConta.cnpj_empresa == cnpj_empresa,
+            PendenciaConta.tipo == tipo,
+            PendenciaConta.conta_cliente.in_(contas_cliente),
+        )
+        afetados = set(
+            (
+                await self._db.execute(
+                    select(PendenciaConta.protocolo_id).where(*filtro).distinct()
+                )
+            ).scalars().all()
+        )
+        if afetados:
+            await self._db.execute(delete(PendenciaConta).where(*filtro))
+            await self._db.commit()
+        return afetados
+
+    async def contas_pendentes(self, protocolo_id: int) -> list[tuple[str, str]]:
+        """Pares ``(tipo, conta)`` que ainda bloqueiam o protocolo."""
+        return [
+            (tipo, conta)
+            for tipo, conta in (
+                await self._db.execute(
+                    select(PendenciaConta.tipo, PendenciaConta.conta_cliente).where(
+                        PendenciaConta.protocolo_id == protocolo_id
+                    )
+                )
+            ).all()
+        ]
+
+    async def remover_por_protocolos(self, protocolo_ids: list[int]) -> None:
+        """Remove o índice dos protocolos (sem commit)."""
+        await self._db.execute(
+            delete(PendenciaConta).where(PendenciaConta.protocolo_id.in_(protocolo_ids))
+        )
@@ -1,10 +1,13 @@
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.protocolo import Protocolo
+from app.models.protocolo_arquivado import ProtocoloArquivado
 from app.models.staging_entry import StagingEntry
+from app.repositories.pendencia_conta_repository import PendenciaContaRepository
+from app.repositories.resumo_protocolo_repository import ResumoProtocoloRepository
 
 
 class ProtocoloRepository:
@@ -52,20 +55,27 @@ class ProtocoloRepository:
         return protocolo
 
     async def deletar(self, protocolo: Protocolo, deletar_entries: bool = True) -> int:
+        return await self.deletar_varios([protocolo.id], deletar_entries)
+
+    async def deletar_varios(
+        self, protocolo_ids: list[int], deletar_entries: bool = True
+    ) -> int:
+        """Remove os protocolos e seus dependentes numa transação; devolve o staging removido."""
         entries_count = 0
         if deletar_entries:
-            entries = list(
-                (
-                    await self._db.execute(
-                        select(StagingEntry).where(
-                            StagingEntry.protocolo_id == protocolo.id
-                        )
-                    )
-                ).scalars().all()
+            entries_count = (
+                await self._db.execute(
+                    delete(StagingEntry).where(StagingEntry.protocolo_id.in_(protocolo_ids))
+                )
+            ).rowcount
+        await PendenciaContaRepository(self._db).remover_por_protocolos(protocolo_ids)
+        await ResumoProtocoloRepository(self._db).remover_por_protocolos(protocolo_ids)
+        await self._db.execute(
+            delete(ProtocoloArquivado).where(
+                ProtocoloArquivado.protocolo_id.in_(protocolo_ids)
             )
-            for entry in entries:
-                await self._db.delete(entry)
-            entries_count = len(entries)
-        await self._db.delete(protocolo)
+        )
+        # DELETE direto: session.delete carregaria ``entries`` só para desvinculá-las.
+        await self._db.execute(delete(Protocolo).where(Protocolo.id.in_(protocolo_ids)))
         await self._db.commit()
         return entries_count
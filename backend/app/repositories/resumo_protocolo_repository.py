@@ -0,0 +1,40 @@
+import json
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.resumo_protocolo import ResumoProtocolo
+
+
+class ResumoProtocoloRepository:
+    """Responsabilidade única: persistir o resumo de conciliação por protocolo."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def substituir(self, protocolo_id: int, resumo: dict) -> None:
+        """Grava o resumo do protocolo, trocando o anterior (sem commit)."""
+        await self.remover_por_protocolos([protocolo_id])
+        self._db.add(
+            ResumoProtocolo(
+                protocolo_id=protocolo_id,
+                resumo_json=json.dumps(resumo, ensure_ascii=False),
+            )
+        )
+
+    async def buscar(self, protocolo_id: int) -> Optional[dict]:
+        resumo_json = (
+            await self._db.execute(
+                select(ResumoProtocolo.resumo_json).where(
+                    ResumoProtocolo.protocolo_id == protocolo_id
+                )
+            )
+        ).scalar_one_or_none()
+        return json.loads(resumo_json) if resumo_json else None
+
+    async def remover_por_protocolos(self, protocolo_ids: list[int]) -> None:
+        """Remove os resumos dos protocolos (sem commit)."""
+        await self._db.execute(
+            delete(ResumoProtocolo).where(ResumoProtocolo.protocolo_id.in_(protocolo_ids))
+        )
@@ -12,10 +12,37 @@ class LoteContabilCreate(BaseModel):
     email_destinatario: EmailStr #
     layout_nome: str # ex: layout_brastelha_1
     arquivo_base64: str = Field(..., description="Conteúdo do Excel em Base64") #
+    validar_antes: bool = Field(default=False, description="Roda o preflight e recusa o lote se houver erro de período ou se a validação não for completa")
 
     @field_validator('cnpj')
     @classmethod
     def validate_cnpj_length(cls, v: str) -> str:
         if len(v) != 14:
             raise ValueError("CNPJ deve ter 14 dígitos")
-        return v
\ No newline at end of file
+        return v
+
+class EnvioArquivoManifesto(BaseModel):
+    arquivo: str = Field(..., description="Nome do arquivo no upload/ZIP")
+    protocolo: str
+    codigo_filial: Optional[int] = Field(None, ge=1, le=10000)
+    lote_inicial: int = Field(default=1)
+
+
+class EnvioLoteManifesto(BaseModel):
+    envio: str = Field(..., description="Identificador do envio (lote pai)")
+    cnpj: str = Field(..., pattern=r"^\d{14}$")
+    codigo_matriz: int = Field(..., ge=1, le=10000)
+    periodo: str = Field(..., description="YYYY-MM")
+    email_destinatario: EmailStr
+    layout_nome: str
+    gerar_txt_unico: bool = Field(default=False, description="Expõe um único TXT 6100 mesclado")
+    arquivos: list[EnvioArquivoManifesto] = Field(..., min_length=1)
+
+
+class PreflightRequest(BaseModel):
+    cnpj: str = Field(..., pattern=r"^\d{14}$")
+    periodo: str = Field(..., description="YYYY-MM")
+    layout_nome: str
+    arquivo_base64: str = Field(..., description="Conteúdo do Excel em Base64")
+    max_erros: int = Field(default=50, ge=1, le=1000, description="Interrompe ao atingir N erros de período; lista no máximo N contas sem mapa")
+    orcamento_ms: int = Field(default=3000, ge=100, le=10000, description="Tempo máximo de análise")
@@ -0,0 +1,15 @@
+"""Execução do processamento de lote fora do ciclo da requisição."""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database import engine
+
+
+async def processar_em_background(protocolo_id: int, arquivo: str, layout: str) -> None:
+    """Abre uma sessão própria e processa o protocolo (uso em BackgroundTasks)."""
+    # Importado no primeiro job: o processador (e o calamine) não pesa na partida.
+    from app.services.lote_processor import LoteProcessor
+
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as db:
+        await LoteProcessor(db).processar(protocolo_id, arquivo, layout)
@@ -0,0 +1,97 @@
+"""Resumo de conciliação: totais por conta, dia e código de histórico."""
+from typing import Iterable
+
+from app.services.row_batch import RowBatch, desempacotar_data
+
+# Agregado: chave → [quantidade, valor]
+_Agregado = dict[str, list]
+
+
+class ResumoConciliacao:
+    """Responsabilidade única: acumular totais de um ou mais RowBatch.
+
+    Trabalha sobre as colunas já extraídas (códigos dos StringPools e
+    ``array('d')``): agrupa por código e só traduz para texto uma vez por
+    valor distinto, sem reler o arquivo nem o staging.
+    """
+
+    def __init__(self) -> None:
+        self.linhas = 0
+        self.descartadas = 0
+        self.valor_total = 0.0
+        self._por_debito: _Agregado = {}
+        self._por_credito: _Agregado = {}
+        self._por_dia: _Agregado = {}
+        self._por_cod_historico: _Agregado = {}
+        # aba → [linhas, descartadas], na ordem em que apareceram
+        self._por_aba: dict[str, list[int]] = {}
+
+    def acumular(self, batch: RowBatch) -> "ResumoConciliacao":
+        valores = batch.valores
+        self.linhas += len(batch)
+        self.descartadas += batch.descartadas
+        self.valor_total += sum(valores)
+        self._mesclar(self._por_debito, _agrupar(batch.debitos, valores), batch.contas.__getitem__)
+        self._mesclar(self._por_credito, _agrupar(batch.creditos, valores), batch.contas.__getitem__)
+        self._mesclar(self._por_dia, _agrupar(batch.datas, valores), _formatar_dia)
+        self._mesclar(
+            self._por_cod_historico,
+            _agrupar(batch.cod_historicos, valores),
+            batch.textos.__getitem__,
+        )
+        for nome, linhas, descartadas in batch.abas:
+            contagem = self._por_aba.setdefault(nome, [0, 0])
+            contagem[0] += linhas
+            contagem[1] += descartadas
+        return self
+
+    def como_dict(self) -> dict:
+        return {
+            "linhas": self.linhas,
+            "linhas_descartadas": self.descartadas,
+            "valor_total": round(self.valor_total, 2),
+            "por_conta_debito": _listar(self._por_debito, "conta"),
+            "por_conta_credito": _listar(self._por_credito, "conta"),
+            "por_dia": _listar(self._por_dia, "data"),
+            "por_cod_historico": _listar(self._por_cod_historico, "cod_historico"),
+            "por_aba": [
+                {"aba": nome, "linhas": linhas, "linhas_descartadas": descartadas}
+                for nome, (linhas, descartadas) in self._por_aba.items()
+            ],
+        }
+
+    @staticmethod
+    def _mesclar(destino: _Agregado, origem: dict[int, list], texto) -> None:
+        for codigo, (quantidade, valor) in origem.items():
+            chave = texto(codigo)
+            acumulado = destino.setdefault(chave, [0, 0.0])
+            acumulado[0] += quantidade
+            acumulado[1] += valor
+
+
+def _agrupar(chaves: Iterable[int], valores: Iterable[float]) -> dict[int, list]:
+    grupos: dict[int, list] = {}
+    for chave, valor in zip(chaves, valores):
+        acumulado = grupos.get(chave)
+        if acumulado is None:
+            grupos[chave] = [1, valor]
+        else:
+            acumulado[0] += 1
+            acumulado[1] += valor
+    return grupos
+
+
+def _formatar_dia(data: int) -> str:
+    # Ordenável como texto; datas não interpretadas (0) viram "invalida".
+    if not data:
+        return "invalida"
+    dia, mes, ano = desempacotar_data(data)
+    return f"{ano:04d}-{mes:02d}-{dia:02d}"
+
+
+def _listar(agregado: _Agregado, nome_chave: str) -> list[dict]:
+    return [
+        {nome_chave: chave, "quantidade": quantidade, "valor": round(valor, 2)}
+        for chave, (quantidade, valor) in sorted(agregado.items())
+    ]
+
@@ -5,6 +5,10 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.account_mapping import AccountMapping
+from app.services.row_batch import RowBatch
+
+# Limite conservador de parâmetros por cláusula IN no SQLite.
+_TAMANHO_LOTE_IN = 500
 
 
 class ContaMapper:
@@ -15,21 +19,38 @@ class ContaMapper:
         self._db = db
         self._cache: dict[str, Optional[str]] = {}
 
-    async def resolver(self, conta_raw: str, tipo: str) -> Optional[str]:
-        """Retorna conta contábil mapeada ou None se pendente."""
-        cache_key = f"{self._cnpj}:{tipo}:{conta_raw}"
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+    async def resolver_lote(
+        self, batch: RowBatch
+    ) -> tuple[dict[int, Optional[str]], dict[int, Optional[str]]]:
+        """Resolve as contas distintas do lote com consultas em bloco.
+
+        Retorna dois dicionários (débito, crédito) indexados pelo código da
+        conta em ``batch.contas``; contas sem mapeamento ficam como None.
+        """
+        debitos = await self._resolver_codigos(batch, set(batch.debitos), "DEBITO")
+        creditos = await self._resolver_codigos(batch, set(batch.creditos), "CREDITO")
+        return debitos, creditos
 
-        stmt = (
-            select(AccountMapping.conta_contabilidade)
-            .where(
+    async def _resolver_codigos(
+        self, batch: RowBatch, codigos: set[int], tipo: str
+    ) -> dict[int, Optional[str]]:
+        contas = {batch.contas[c]: c for c in codigos}
+        faltantes = [
+            conta for conta in contas if f"{self._cnpj}:{tipo}:{conta}" not in self._cache
+        ]
+        for inicio in range(0, len(faltantes), _TAMANHO_LOTE_IN):
+            bloco = faltantes[inicio : inicio + _TAMANHO_LOTE_IN]
+            stmt = select(
+                AccountMapping.conta_cliente, AccountMapping.conta_contabilidade
+            ).where(
                 AccountMapping.cnpj_empresa == self._cnpj,
-                AccountMapping.conta_cliente == conta_raw,
                 AccountMapping.tipo == tipo,
+                AccountMapping.conta_cliente.in_(bloco),
             )
-            .limit(1)
-        )
-        resultado = (await self._db.execute(stmt)).scalar_one_or_none()
-        self._cache[cache_key] = resultado
-        return resultado
+            encontrados = dict((await self._db.execute(stmt)).all())
+            for conta in bloco:
+                self._cache[f"{self._cnpj}:{tipo}:{conta}"] = encontrados.get(conta)
+        return {
+            codigo: self._cache[f"{self._cnpj}:{tipo}:{conta}"]
+            for conta, codigo in contas.items()
+        }
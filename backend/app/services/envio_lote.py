@@ -0,0 +1,220 @@
+"""Envio de vários arquivos (ou ZIP) num único lote pai com protocolos filhos."""
+import asyncio
+import base64
+import io
+import os
+import zipfile
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import EnvioLoteInvalidoError
+from app.models.envio_lote import EnvioLote, EnvioLoteItem
+from app.models.protocolo import Protocolo
+from app.repositories.protocolo_repository import ProtocoloRepository
+from app.schemas.lote import EnvioLoteManifesto
+from app.services.background import processar_em_background
+from app.services.retencao import RetencaoService
+from app.services.txt_exporter import TxtExporter
+
+NOME_MANIFESTO_ZIP = "manifest.json"
+CONCORRENCIA_PADRAO = int(os.environ.get("ENVIO_CONCORRENCIA") or min(4, os.cpu_count() or 1))
+# Proteção contra ZIPs que expandem demais (zip bomb).
+_MAX_BYTES_DESCOMPACTADOS = 200 * 1024 * 1024
+
+
+def extrair_zip(conteudo: bytes) -> dict[str, bytes]:
+    """Arquivos de um ZIP indexados pelo nome base (pastas são ignoradas)."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+            infos = [i for i in zf.infolist() if not i.is_dir()]
+            if sum(i.file_size for i in infos) > _MAX_BYTES_DESCOMPACTADOS:
+                raise EnvioLoteInvalidoError("ZIP excede o tamanho descompactado permitido.")
+            return {os.path.basename(i.filename): zf.read(i) for i in infos}
+    except zipfile.BadZipFile as e:
+        raise EnvioLoteInvalidoError(f"ZIP inválido: {e}") from e
+
+
+class EnvioLoteService:
+    """Responsabilidade única: criar envios e agregar o status dos filhos."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def criar(
+        self, manifesto: EnvioLoteManifesto, arquivos: dict[str, bytes]
+    ) -> tuple[EnvioLote, list[Protocolo]]:
+        """Valida o manifesto contra os arquivos e grava envio + protocolos PENDING."""
+        self._validar(manifesto, arquivos)
+        if await self._buscar_envio(manifesto.envio):
+            raise EnvioLoteInvalidoError("Envio já existente.")
+        numeros = [a.protocolo for a in manifesto.arquivos]
+        existentes = (
+            await self._db.execute(
+                select(Protocolo.numero_protocolo).where(
+                    Protocolo.numero_protocolo.in_(numeros)
+                )
+            )
+        ).scalars().all()
+        if existentes:
+            raise EnvioLoteInvalidoError(
+                f"Protocolo(s) já existente(s): {', '.join(existentes)}."
+            )
+
+        envio = EnvioLote(
+            numero_envio=manifesto.envio,
+            cnpj=manifesto.cnpj,
+            periodo=manifesto.periodo,
+            gerar_txt_unico=manifesto.gerar_txt_unico,
+        )
+        self._db.add(envio)
+        protocolos = [
+            Protocolo(
+                numero_protocolo=item.protocolo,
+                cnpj=manifesto.cnpj,
+                periodo=manifesto.periodo,
+                codigo_matriz=manifesto.codigo_matriz,
+                codigo_filial=item.codigo_filial,
+                email_destinatario=manifesto.email_destinatario,
+                lote_inicial=item.lote_inicial,
+                arquivo_base64_raw=base64.b64encode(arquivos[item.arquivo]).decode(),
+                status="PENDING",
+            )
+            for item in manifesto.arquivos
+        ]
+        self._db.add_all(protocolos)
+        await self._db.flush()
+        self._db.add_all(
+            EnvioLoteItem(
+                envio_id=envio.id,
+                protocolo_id=p.id,
+                nome_arquivo=item.arquivo,
+                ordem=ordem,
+            )
+            for ordem, (item, p) in enumerate(zip(manifesto.arquivos, protocolos))
+        )
+        await self._db.commit()
+        return envio, protocolos
+
+    async def status(self, numero_envio: str) -> Optional[dict]:
+        """Status agregado do envio, filhos em ordem e TXT mesclado se aplicável."""
+        envio = await self._buscar_envio(numero_envio)
+        if not envio:
+            return None
+        filhos = (
+            await self._db.execute(
+                select(EnvioLoteItem.nome_arquivo, Protocolo)
+                .join(Protocolo, Protocolo.id == EnvioLoteItem.protocolo_id)
+                .where(EnvioLoteItem.envio_id == envio.id)
+                .order_by(EnvioLoteItem.ordem)
+            )
+        ).all()
+        contagem = Counter(p.status for _, p in filhos)
+        status = self._status_agregado(contagem, len(filhos))
+
+        resultado = "pendente"
+        if envio.gerar_txt_unico and status == "COMPLETED":
+            retencao = RetencaoService(self._db)
+            resultado = TxtExporter(envio.cnpj, None).mesclar_base64(
+                [await retencao.carregar_txt(p) or "" for _, p in filhos]
+            )
+        return {
+            "sucesso": True,
+            "envio": envio.numero_envio,
+            "status": status,
+            "contagem": dict(contagem),
+            "resultado": resultado,
+            "protocolos": [
+                {
+                    "arquivo": nome,
+                    "protocolo": p.numero_protocolo,
+                    "status": p.status,
+                    "error_message": p.error_message if p.status == "ERROR" else None,
+                }
+                for nome, p in filhos
+            ],
+        }
+
+    async def excluir(self, numero_envio: str) -> Optional[list[str]]:
+        """Exclui o envio e todos os filhos; None se o envio não existe.
+
+        Filhos só saem junto com o envio (o TXT mesclado nunca fica
+        incompleto); depois disso o mesmo envio pode ser reenviado.
+        """
+        envio = await self._buscar_envio(numero_envio)
+        if not envio:
+            return None
+        filhos = (
+            await self._db.execute(
+                select(Protocolo.id, Protocolo.numero_protocolo, Protocolo.status)
+                .join(EnvioLoteItem, EnvioLoteItem.protocolo_id == Protocolo.id)
+                .where(EnvioLoteItem.envio_id == envio.id)
+                .order_by(EnvioLoteItem.ordem)
+            )
+        ).all()
+        if any(status == "PENDING" for _, _, status in filhos):
+            raise EnvioLoteInvalidoError("Aguarde o processamento de todos os protocolos do envio.")
+        retencao = RetencaoService(self._db)
+        for protocolo_id, _, _ in filhos:
+            await retencao.remover_arquivo(protocolo_id)
+        await self._db.execute(delete(EnvioLoteItem).where(EnvioLoteItem.envio_id == envio.id))
+        await self._db.execute(delete(EnvioLote).where(EnvioLote.id == envio.id))
+        # Commita junto com o envio: filhos e pai saem na mesma transação.
+        await ProtocoloRepository(self._db).deletar_varios([pid for pid, _, _ in filhos])
+        return [numero for _, numero, _ in filhos]
+
+    async def envio_do_protocolo(self, protocolo_id: int) -> Optional[str]:
+        """Número do envio ao qual o protocolo pertence, se houver."""
+        return (
+            await self._db.execute(
+                select(EnvioLote.numero_envio)
+                .join(EnvioLoteItem, EnvioLoteItem.envio_id == EnvioLote.id)
+                .where(EnvioLoteItem.protocolo_id == protocolo_id)
+            )
+        ).scalar_one_or_none()
+
+    async def _buscar_envio(self, numero_envio: str) -> Optional[EnvioLote]:
+        return (
+            await self._db.execute(
+                select(EnvioLote).where(EnvioLote.numero_envio == numero_envio)
+            )
+        ).scalar_one_or_none()
+
+    @staticmethod
+    def _status_agregado(contagem: Counter, total: int) -> str:
+        if contagem["PENDING"]:
+            return "PENDING"
+        if contagem["COMPLETED"] == total:
+            return "COMPLETED"
+        if contagem["WAITING_MAPPING"]:
+            return "WAITING_MAPPING"
+        return "ERROR"
+
+    @staticmethod
+    def _validar(manifesto: EnvioLoteManifesto, arquivos: dict[str, bytes]) -> None:
+        nomes = [a.arquivo for a in manifesto.arquivos]
+        protocolos = [a.protocolo for a in manifesto.arquivos]
+        if len(set(protocolos)) != len(protocolos):
+            raise EnvioLoteInvalidoError("Protocolos repetidos no manifesto.")
+        faltantes = [n for n in nomes if n not in arquivos]
+        if faltantes:
+            raise EnvioLoteInvalidoError(
+                f"Arquivo(s) do manifesto não enviados: {', '.join(faltantes)}."
+            )
+
+
+async def processar_envio(
+    protocolos: list[tuple[int, str]],
+    layout: str,
+    concorrencia: int = CONCORRENCIA_PADRAO,
+) -> None:
+    """Processa os filhos (id, base64) em paralelo, limitado por ``concorrencia``."""
+    semaforo = asyncio.Semaphore(max(1, concorrencia))
+
+    async def _um(protocolo_id: int, arquivo: str) -> None:
+        async with semaforo:
+            await processar_em_background(protocolo_id, arquivo, layout)
+
+    await asyncio.gather(*(_um(pid, arquivo) for pid, arquivo in protocolos))
@@ -1,40 +1,253 @@
-"""Parser de bytes Excel → lista de linhas brutas."""
+"""Parser de bytes Excel/CSV → lote colunar de linhas brutas."""
 import base64
+import csv
+import fnmatch
 import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any
-
-from python_calamine import CalamineWorkbook
+from typing import Any, Iterator, Optional, Sequence
 
+from app.core.exceptions import AbaNaoEncontradaError, FormatoArquivoInvalidoError
 from app.models.layout_excel import LayoutExcel
+from app.models.layout_excel_csv import LayoutExcelCsv
+from app.services.row_batch import LinhaBruta, RowBatch, empacotar_data
+
+__all__ = ["ExcelParser", "LinhaBruta", "OpcoesCsv", "RowBatch", "e_planilha", "extensao_arquivo"]
+
+# XLSX, XLSB e ODS são ZIP; XLS é OLE2. O calamine detecta qual pelo conteúdo.
+_ASSINATURAS_PLANILHA = (b"PK\x03\x04", b"\xd0\xcf\x11\xe0")
+ABAS_PARALELAS = int(os.environ.get("PARSER_ABAS_PARALELAS") or min(4, os.cpu_count() or 1))
+# Valor em texto que serve para as duas convenções ("1.500", "2,750").
+_AMBIGUO = object()
+
+
+def _preenchida(celula: Any) -> bool:
+    return celula is not None and (not isinstance(celula, str) or bool(celula.strip()))
+
+
+def e_planilha(conteudo: bytes) -> bool:
+    """True para formatos lidos pelo calamine; o resto é tratado como CSV."""
+    return conteudo[:4] in _ASSINATURAS_PLANILHA
+
+
+def extensao_arquivo(conteudo: bytes) -> str:
+    """Extensão usual do arquivo enviado: xlsx, xlsb, ods, xls ou csv."""
+    if not e_planilha(conteudo):
+        return "csv"
+    if conteudo[:4] == _ASSINATURAS_PLANILHA[1]:
+        return "xls"
+    try:
+        nomes = set(zipfile.ZipFile(io.BytesIO(conteudo)).namelist())
+    except zipfile.BadZipFile:
+        return "xlsx"
+    if "xl/workbook.bin" in nomes:
+        return "xlsb"
+    return "ods" if "content.xml" in nomes else "xlsx"
+
+
+def _separador_decimal(celula: str) -> Any:
+    """True se o texto só faz sentido com vírgula decimal, False se só com
+    ponto, ``_AMBIGUO`` se serve para os dois e None se não tem separador."""
+    s = celula.strip()
+    virgula, ponto = s.rfind(","), s.rfind(".")
+    if virgula == ponto:  # os dois ausentes
+        return None
+    if virgula >= 0 and ponto >= 0:
+        return virgula > ponto  # "1.234,56" / "1,234.56"
+    sep = "," if virgula >= 0 else "."
+    if s.count(sep) > 1:
+        return sep == "."  # "12.345.678": o separador repetido é de milhar
+    inteiro, _, decimais = s.partition(sep)
+    if len(decimais) != 3 or inteiro.lstrip("+-") in ("", "0"):
+        return sep == ","  # "1234,5", "0.500": não pode ser milhar
+    return _AMBIGUO
 
 
 @dataclass
-class LinhaBruta:
-    """Linha de lançamento extraída do Excel, sem enriquecimento."""
+class OpcoesCsv:
+    """Como ler arquivos CSV. ``None`` em qualquer campo = detectar sozinho."""
+
+    delimitador: Optional[str] = None
+    decimal_virgula: Optional[bool] = None
+    encoding: Optional[str] = None
+
+    @classmethod
+    def do_ambiente(cls) -> "OpcoesCsv":
+        decimal = os.environ.get("CSV_DECIMAL_VIRGULA")
+        return cls(
+            delimitador=os.environ.get("CSV_DELIMITADOR") or None,
+            decimal_virgula=None if not decimal else decimal not in ("0", "false"),
+            encoding=os.environ.get("CSV_ENCODING") or None,
+        )
 
-    data_formatada: str
-    valor: float
-    conta_debito_raw: str
-    conta_credito_raw: str
-    historico: str
-    cod_historico: str
+    @classmethod
+    def do_layout(cls, config: Optional[LayoutExcelCsv]) -> "OpcoesCsv":
+        """Opções cadastradas no layout; o que ficar None vem do ambiente."""
+        opcoes = cls.do_ambiente()
+        if config is None:
+            return opcoes
+        return cls(
+            delimitador=config.delimitador or opcoes.delimitador,
+            decimal_virgula=(
+                opcoes.decimal_virgula if config.decimal_virgula is None else config.decimal_virgula
+            ),
+            encoding=config.encoding or opcoes.encoding,
+        )
 
 
 class ExcelParser:
-    """Responsabilidade única: converter arquivo Excel em lista de LinhaBruta."""
+    """Responsabilidade única: converter arquivo Excel (ou CSV) em RowBatch.
 
-    def __init__(self, layout: LayoutExcel) -> None:
+    As letras de coluna do layout valem para todos os formatos: no CSV, "A" é
+    o primeiro campo de cada linha.
+    """
+
+    def __init__(
+        self,
+        layout: LayoutExcel,
+        opcoes_csv: Optional[OpcoesCsv] = None,
+        abas: Sequence[str] = (),
+    ) -> None:
         self._layout = layout
+        self._csv = opcoes_csv or OpcoesCsv.do_ambiente()
+        self._abas = list(abas)
+
+    def parsear(self, arquivo_base64: str) -> RowBatch:
+        """Decodifica base64 e extrai linhas brutas das abas do layout."""
+        batch = RowBatch()
+        for nome, aba in self._abas_do_arquivo(arquivo_base64):
+            inicio, descartadas = len(batch), batch.descartadas
+            if isinstance(aba, RowBatch):
+                aba.recodificar(batch.contas, batch.textos)
+                batch.anexar(aba)
+                batch.descartadas += aba.descartadas
+            else:
+                self._acumular(batch, aba)
+            batch.registrar_aba(nome, inicio, descartadas)
+        return batch
 
-    def parsear(self, arquivo_base64: str) -> list[LinhaBruta]:
-        """Decodifica base64 e extrai linhas brutas do Excel."""
+    def iterar_lotes(
+        self, arquivo_base64: str, tamanho_lote: int = 5000
+    ) -> Iterator[RowBatch]:
+        """Como ``parsear``, mas entrega lotes de até ``tamanho_lote`` linhas.
+
+        Os lotes compartilham os StringPools, então códigos de conta são
+        comparáveis entre lotes. Uma aba pode aparecer em mais de um lote.
+        """
+        batch = RowBatch()
+        for nome, aba in self._abas_do_arquivo(arquivo_base64):
+            inicio, descartadas = len(batch), batch.descartadas
+            if isinstance(aba, RowBatch):
+                aba.recodificar(batch.contas, batch.textos)
+                batch.descartadas += aba.descartadas
+                posicao = 0
+                while posicao < len(aba):
+                    fim = min(len(aba), posicao + tamanho_lote - len(batch))
+                    batch.anexar(aba, posicao, fim)
+                    posicao = fim
+                    if len(batch) >= tamanho_lote:
+                        batch.registrar_aba(nome, inicio, descartadas)
+                        yield batch
+                        batch = RowBatch(batch.contas, batch.textos)
+                        inicio, descartadas = 0, 0
+            else:
+                for linha in aba:
+                    if linha is None:
+                        batch.descartadas += 1
+                        continue
+                    batch.adicionar(*linha)
+                    if len(batch) >= tamanho_lote:
+                        batch.registrar_aba(nome, inicio, descartadas)
+                        yield batch
+                        batch = RowBatch(batch.contas, batch.textos)
+                        inicio, descartadas = 0, 0
+            batch.registrar_aba(nome, inicio, descartadas)
+        if len(batch) or batch.descartadas:
+            yield batch
+
+    def _abas_do_arquivo(
+        self, arquivo_base64: str
+    ) -> Iterator[tuple[str, Iterator[Optional[tuple]] | RowBatch]]:
+        """(nome da aba, conteúdo) na ordem das abas na planilha.
+
+        O arquivo é decodificado uma vez. Uma aba só (ou CSV) vem como iterador
+        de linhas convertidas, em streaming; com várias, cada uma é extraída
+        numa thread (até ABAS_PARALELAS) para um RowBatch com pools próprios,
+        que quem consome recodifica nos pools compartilhados.
+        """
         raw_b64 = arquivo_base64.split(",")[-1] if "," in arquivo_base64 else arquivo_base64
-        file_bytes = base64.b64decode(raw_b64)
+        try:
+            file_bytes = base64.b64decode(raw_b64)
+        except ValueError as e:
+            # binascii.Error (padding/alfabeto) ou texto não-ASCII.
+            raise FormatoArquivoInvalidoError(f"Base64 inválido: {e}") from None
+        if not e_planilha(file_bytes):
+            yield "csv", self._converter(
+                self._linhas_csv(file_bytes), decimal_virgula=self._csv.decimal_virgula
+            )
+            return
+
+        # Import no primeiro uso: a extensão nativa fica fora da partida do app.
+        from python_calamine import CalamineWorkbook
+
         workbook = CalamineWorkbook.from_filelike(io.BytesIO(file_bytes))
-        sheet = workbook.get_sheet_by_index(0)
+        nomes = self._selecionar_abas(workbook.sheet_names)
+        if len(nomes) == 1:
+            yield nomes[0], self._converter(workbook.get_sheet_by_name(nomes[0]).iter_rows())
+            return
+
+        def _extrair(nome: str) -> RowBatch:
+            # Workbook próprio por thread; os bytes decodificados são compartilhados.
+            aba = CalamineWorkbook.from_filelike(io.BytesIO(file_bytes)).get_sheet_by_name(nome)
+            return self._acumular(RowBatch(), self._converter(aba.iter_rows()))
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(len(nomes), ABAS_PARALELAS)))
+        try:
+            futuros = [pool.submit(_extrair, nome) for nome in nomes]
+            for nome, futuro in zip(nomes, futuros):
+                yield nome, futuro.result()
+        finally:
+            # Gerador fechado antes do fim (preflight parou cedo): não espera as
+            # abas restantes; as que ainda não começaram são canceladas.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _acumular(batch: RowBatch, linhas: Iterator[Optional[tuple]]) -> RowBatch:
+        for linha in linhas:
+            if linha is None:
+                batch.descartadas += 1
+            else:
+                batch.adicionar(*linha)
+        return batch
+
+    def _selecionar_abas(self, abas: list[str]) -> list[str]:
+        if not self._abas:
+            return abas[:1]
+        escolhidas: set[str] = set()
+        for padrao in self._abas:
+            if padrao.isdigit():
+                if int(padrao) < len(abas):
+                    escolhidas.add(abas[int(padrao)])
+            else:
+                escolhidas.update(
+                    aba for aba in abas if fnmatch.fnmatchcase(aba.casefold(), padrao.casefold())
+                )
+        if not escolhidas:
+            raise AbaNaoEncontradaError(self._abas, abas)
+        return [aba for aba in abas if aba in escolhidas]
 
+    def _converter(
+        self, rows: Iterator[Sequence[Any]], decimal_virgula: Optional[bool] = None
+    ) -> Iterator[Optional[tuple]]:
+        """Tuplas na ordem de ``RowBatch.adicionar``; None para linha descartada.
+
+        ``decimal_virgula`` vale só para CSV. Sem ele (e em planilha, para valor
+        digitado como texto) a convenção é decidida uma vez para a coluna de
+        valor, pelo primeiro texto que só serve para uma delas.
+        """
         idx_data = self._col_idx(self._layout.col_data)
         idx_dia = 5  # Fixo: V_Dia Lancamento
         idx_debito = self._col_idx(self._layout.col_conta_debito)
@@ -43,27 +256,115 @@ class ExcelParser:
         idx_cod = self._col_idx(self._layout.col_cod_historico)
         idx_hist = self._col_idx(self._layout.col_historico)
 
-        linhas: list[LinhaBruta] = []
         min_cols = max(idx_data, idx_dia, idx_debito, idx_credito, idx_valor)
 
-        for row in list(sheet.to_python())[1:]:
-            if not row or len(row) <= min_cols:
+        # iter_rows (ao contrário do antigo to_python) não pula as linhas vazias
+        # do topo: o cabeçalho é a primeira linha com conteúdo.
+        for row in rows:
+            if any(_preenchida(c) for c in row):
+                break
+        decimal = [decimal_virgula]
+        if decimal_virgula is None:
+            rows = self._decidir_decimal(rows, idx_valor, decimal)
+        for row in rows:
+            if len(row) <= min_cols:
                 continue
             try:
-                linha = LinhaBruta(
-                    data_formatada=self._formatar_data(row[idx_data], row[idx_dia]),
-                    valor=float(str(row[idx_valor]).replace(",", ".")),
-                    conta_debito_raw=self._normalizar_conta(row[idx_debito]),
-                    conta_credito_raw=self._normalizar_conta(row[idx_credito]),
-                    historico=str(row[idx_hist] if len(row) > idx_hist else ""),
-                    cod_historico=str(row[idx_cod] if len(row) > idx_cod else ""),
-                )
-                if linha.conta_debito_raw and linha.conta_credito_raw:
-                    linhas.append(linha)
+                data = self._empacotar_data(row[idx_data], row[idx_dia])
+                valor = self._converter_valor(row[idx_valor], decimal[0])
+                conta_debito = self._normalizar_conta(row[idx_debito])
+                conta_credito = self._normalizar_conta(row[idx_credito])
+                historico = str(row[idx_hist] if len(row) > idx_hist else "")
+                cod_historico = str(row[idx_cod] if len(row) > idx_cod else "")
             except (ValueError, IndexError, TypeError):
+                # Linha em branco no meio da planilha não conta como descartada.
+                if any(_preenchida(c) for c in row):
+                    yield None
                 continue
+            if conta_debito and conta_credito:
+                yield data, valor, conta_debito, conta_credito, historico, cod_historico
 
-        return linhas
+    def _decidir_decimal(
+        self, rows: Iterator[Sequence[Any]], idx_valor: int, decimal: list
+    ) -> Iterator[Sequence[Any]]:
+        """Repassa ``rows`` e grava em ``decimal[0]`` a convenção da coluna.
+
+        Linhas com valor ambíguo ("1.500") ficam retidas até aparecer um valor
+        que decida; se o arquivo acabar sem isso, ele é recusado.
+        """
+        retidas: list[Sequence[Any]] = []
+        for row in rows:
+            celula = row[idx_valor] if len(row) > idx_valor else None
+            # Célula numérica (o caso comum em planilha) não decide nem retém.
+            sinal = _separador_decimal(celula) if isinstance(celula, str) else None
+            if sinal is None and not retidas:
+                yield row
+            elif sinal is None or sinal is _AMBIGUO:
+                if not retidas:
+                    exemplo = celula.strip()
+                retidas.append(row)
+            else:
+                decimal[0] = sinal
+                yield from retidas
+                yield row
+                yield from rows
+                return
+        if retidas:
+            raise FormatoArquivoInvalidoError(
+                f"Valores como '{exemplo}' na coluna {self._layout.col_valor} servem "
+                "com ponto ou com vírgula decimal. Em CSV, informe a convenção do layout "
+                "(python -m app.cli layout-csv); em planilha, grave os valores como número."
+            )
+
+    def _linhas_csv(self, conteudo: bytes) -> Iterator[list[str]]:
+        # Tudo que não é ZIP/OLE2 chega aqui: PDF, imagem ou texto solto não
+        # podem virar um "CSV" de zero linhas e um protocolo COMPLETED vazio.
+        if b"\x00" in conteudo:
+            raise FormatoArquivoInvalidoError(
+                "Formato de arquivo não reconhecido: não é planilha (XLSX/XLS/XLSB/ODS) nem CSV."
+            )
+        encoding = self._csv.encoding or _detectar_encoding(conteudo)
+        texto = io.TextIOWrapper(io.BytesIO(conteudo), encoding=encoding, newline="")
+        cabecalho = texto.readline()
+        while cabecalho and not cabecalho.strip():
+            cabecalho = texto.readline()
+        delimitador = self._csv.delimitador or (
+            ";" if cabecalho.count(";") >= cabecalho.count(",") else ","
+        )
+        campos = next(csv.reader([cabecalho], delimiter=delimitador), [])
+        minimo = 1 + max(
+            5,  # V_Dia Lancamento
+            *(
+                self._col_idx(letra)
+                for letra in (
+                    self._layout.col_data,
+                    self._layout.col_conta_debito,
+                    self._layout.col_conta_credito,
+                    self._layout.col_valor,
+                    self._layout.col_cod_historico,
+                    self._layout.col_historico,
+                )
+            ),
+        )
+        if delimitador not in cabecalho or len(campos) < minimo:
+            raise FormatoArquivoInvalidoError(
+                f"Formato de arquivo não reconhecido: o cabeçalho CSV tem {len(campos)} "
+                f"campo(s) separados por '{delimitador}' e o layout usa {minimo} colunas."
+            )
+        yield campos
+        yield from csv.reader(texto, delimiter=delimitador)
+
+    @staticmethod
+    def _converter_valor(raw: Any, decimal_virgula: Optional[bool] = None) -> float:
+        """``decimal_virgula`` None só ocorre quando nenhum valor tem separador."""
+        if isinstance(raw, (int, float)):
+            return float(raw)
+        s = str(raw).strip()
+        if decimal_virgula:
+            s = s.replace(".", "").replace(",", ".")
+        else:
+            s = s.replace(",", "")
+        return float(s)
 
     @staticmethod
     def _col_idx(letra: str) -> int:
@@ -76,13 +377,18 @@ class ExcelParser:
         return str(value).strip()
 
     @staticmethod
-    def _formatar_data(raw_date: Any, dia: Any) -> str:
+    def _empacotar_data(raw_date: Any, dia: Any) -> int | str:
+        """Data como AAAAMMDD; texto quando não representável como inteiro."""
         if isinstance(raw_date, datetime):
             mes, ano = raw_date.month, raw_date.year
         else:
             s = str(raw_date).strip()
             try:
-                dt = datetime.fromisoformat(s[:10])
+                dt = (
+                    datetime.strptime(s[:10], "%d/%m/%Y")
+                    if s[2:3] == "/"
+                    else datetime.fromisoformat(s[:10])
+                )
                 mes, ano = dt.month, dt.year
             except ValueError:
                 return s
@@ -90,4 +396,15 @@ class ExcelParser:
             dia_int = int(float(str(dia)))
         except (ValueError, TypeError):
             dia_int = 1
-        return f"{dia_int:02d}/{mes:02d}/{ano}"
+        if not 0 <= dia_int <= 99:
+            return f"{dia_int:02d}/{mes:02d}/{ano}"
+        return empacotar_data(dia_int, mes, ano)
+
+
+def _detectar_encoding(conteudo: bytes) -> str:
+    # Exportações do Excel no Windows costumam vir em cp1252.
+    try:
+        conteudo.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1252"
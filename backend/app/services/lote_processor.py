@@ -1,20 +1,27 @@
 """Orquestrador do processamento de lote contábil."""
-import base64
+import asyncio
+from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.exceptions import LayoutNaoEncontradoError
 from app.models.layout_excel import LayoutExcel
+from app.models.layout_excel_csv import LayoutExcelCsv
 from app.models.protocolo import Protocolo
 from app.models.staging_entry import StagingEntry
+from app.repositories.layout_excel_repository import LayoutExcelRepository
+from app.repositories.pendencia_conta_repository import PendenciaContaRepository
+from app.repositories.resumo_protocolo_repository import ResumoProtocoloRepository
+from app.services.conciliacao import ResumoConciliacao
 from app.services.conta_mapper import ContaMapper
-from app.services.excel_parser import ExcelParser
+from app.services.excel_parser import ExcelParser, OpcoesCsv, RowBatch
 from app.services.periodo_validator import PeriodoValidator
+from app.services.txt_exporter import TxtExporter
 
 
 class LoteProcessor:
-    """Orquestra: layout → parser → validator → mapper → persistência."""
+    """Orquestra: layout → parser → validator → mapper → exporter/persistência."""
 
     def __init__(self, db: AsyncSession) -> None:
         self._db = db
@@ -23,7 +30,7 @@ class LoteProcessor:
         self, protocolo_id: int, arquivo_base64: str, layout_nome: str
     ) -> None:
         try:
-            layout = await self._carregar_layout(layout_nome)
+            layout, opcoes_csv = await self._carregar_layout(layout_nome)
             protocolo = (
                 await self._db.execute(
                     select(Protocolo).where(Protocolo.id == protocolo_id)
@@ -31,56 +38,62 @@ class LoteProcessor:
             ).scalar_one()
 
             validator = PeriodoValidator(protocolo.periodo)
-            parser = ExcelParser(layout)
+            parser = ExcelParser(
+                layout,
+                OpcoesCsv.do_layout(opcoes_csv),
+                await LayoutExcelRepository(self._db).buscar_abas(layout.id),
+            )
             mapper = ContaMapper(protocolo.cnpj, self._db)
+            exporter = TxtExporter(protocolo.cnpj, protocolo.codigo_filial)
+
+            # Fora do event loop: envios com vários arquivos parseiam em paralelo.
+            batch, resumo = await asyncio.to_thread(
+                self._parsear_resumindo, parser, arquivo_base64
+            )
+
+            # Commit próprio, antes da validação: protocolo recusado por
+            # período também fica com o resumo para conferência.
+            await ResumoProtocoloRepository(self._db).substituir(
+                protocolo_id, resumo.como_dict()
+            )
+            await self._db.commit()
+            validator.validar_ou_falhar(validator.validar_lote(batch))
 
-            linhas = parser.parsear(arquivo_base64)
-
-            erros_periodo: list[tuple[int, str]] = []
-            pendencias: list[StagingEntry] = []
-            linhas_txt: list[str] = []
-
-            for idx, linha in enumerate(linhas, start=2):
-                if not validator.validar_data(linha.data_formatada):
-                    erros_periodo.append((idx, linha.data_formatada))
-                    continue
-
-                c_debito = await mapper.resolver(linha.conta_debito_raw, "DEBITO")
-                c_credito = await mapper.resolver(linha.conta_credito_raw, "CREDITO")
-
-                if not c_debito or not c_credito:
-                    pendencias.append(
-                        StagingEntry(
-                            protocolo_id=protocolo_id,
-                            data_lancamento=linha.data_formatada,
-                            valor=linha.valor,
-                            conta_debito_raw=linha.conta_debito_raw,
-                            conta_credito_raw=linha.conta_credito_raw,
-                            historico=linha.historico,
-                            cod_historico=linha.cod_historico,
-                        )
-                    )
-                else:
-                    n_filial = str(protocolo.codigo_filial or "")
-                    valor_br = f"{linha.valor:.2f}".replace(".", ",")
-                    linhas_txt.extend(
-                        [
-                            "|6000|X||||",
-                            f"|6100|{linha.data_formatada}|{c_debito}|{c_credito}|{valor_br}||{linha.historico}|VICTOR|{n_filial}||",
-                        ]
-                    )
-
-            validator.validar_ou_falhar(erros_periodo)
-
-            if pendencias:
-                self._db.add_all(pendencias)
+            debitos, creditos = await mapper.resolver_lote(batch)
+            pendentes = [
+                idx
+                for idx in range(len(batch))
+                if not debitos[batch.debitos[idx]] or not creditos[batch.creditos[idx]]
+            ]
+
+            if pendentes:
+                # INSERT em lote (executemany): add_all emite um INSERT por linha.
+                await self._db.execute(
+                    insert(StagingEntry),
+                    [
+                        {
+                            "protocolo_id": protocolo_id,
+                            "data_lancamento": linha.data_formatada,
+                            "valor": linha.valor,
+                            "conta_debito_raw": linha.conta_debito_raw,
+                            "conta_credito_raw": linha.conta_credito_raw,
+                            "historico": linha.historico,
+                            "cod_historico": linha.cod_historico,
+                        }
+                        for linha in map(batch.__getitem__, pendentes)
+                    ],
+                )
+                await PendenciaContaRepository(self._db).substituir(
+                    protocolo_id,
+                    protocolo.cnpj,
+                    [("DEBITO", batch.contas[c]) for c, m in debitos.items() if not m]
+                    + [("CREDITO", batch.contas[c]) for c, m in creditos.items() if not m],
+                )
                 protocolo.status = "WAITING_MAPPING"
             else:
-                cabecalho = f"|0000|{protocolo.cnpj}|"
-                txt_final = "\n".join([cabecalho, *linhas_txt])
-                protocolo.arquivo_txt_base64 = base64.b64encode(
-                    txt_final.encode()
-                ).decode()
+                protocolo.arquivo_txt_base64 = exporter.gerar_base64(
+                    batch, debitos, creditos
+                )
                 protocolo.status = "COMPLETED"
 
             await self._db.commit()
@@ -90,15 +103,30 @@ class LoteProcessor:
             print(f"❌ ERRO [proto={protocolo_id}]: {e}")
             await self._salvar_erro(protocolo_id, str(e))
 
-    async def _carregar_layout(self, nome: str) -> LayoutExcel:
-        layout = (
-            await self._db.execute(
-                select(LayoutExcel).where(LayoutExcel.nome == nome)
-            )
-        ).scalar_one_or_none()
+    @staticmethod
+    def _parsear_resumindo(
+        parser: ExcelParser, arquivo_base64: str
+    ) -> tuple[RowBatch, ResumoConciliacao]:
+        """Lê o arquivo em lotes, somando cada um ao resumo assim que sai do parser."""
+        resumo = ResumoConciliacao()
+        batch: Optional[RowBatch] = None
+        for lote in parser.iterar_lotes(arquivo_base64):
+            resumo.acumular(lote)
+            if batch is None:
+                batch = lote
+                continue
+            batch.anexar(lote)
+            batch.descartadas += lote.descartadas
+            batch.abas += lote.abas
+        return batch or RowBatch(), resumo
+
+    async def _carregar_layout(
+        self, nome: str
+    ) -> tuple[LayoutExcel, Optional[LayoutExcelCsv]]:
+        layout, opcoes_csv = await LayoutExcelRepository(self._db).buscar_com_opcoes_csv(nome)
         if not layout:
             raise LayoutNaoEncontradoError(nome)
-        return layout
+        return layout, opcoes_csv
 
     async def _salvar_erro(self, protocolo_id: int, mensagem: str) -> None:
         try:
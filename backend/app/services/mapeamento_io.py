@@ -0,0 +1,204 @@
+"""Importação e exportação em massa de mapeamentos de conta por CNPJ."""
+import csv
+import io
+from dataclasses import asdict, dataclass, field
+from itertools import chain
+from typing import Any, AsyncIterator, BinaryIO, Iterable, Iterator, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import ArquivoMapeamentoInvalidoError
+from app.repositories.account_mapping_repository import AccountMappingRepository
+from app.repositories.pendencia_conta_repository import PendenciaContaRepository
+from app.services.excel_parser import e_planilha
+from app.services.sugestoes import indice_sugestoes
+
+COLUNAS = ("conta_cliente", "conta_contabilidade", "tipo")
+TIPOS = ("DEBITO", "CREDITO")
+_MAX_DETALHES = 100
+
+
+def ler_planilha_mapeamento(
+    arquivo: BinaryIO, encoding: str = "utf-8-sig"
+) -> Iterator[list[Any]]:
+    """Itera as linhas (cabeçalho incluso) de um CSV ou XLSX de mapeamentos.
+
+    O formato é detectado pelos bytes iniciais; CSV aceita ``;`` ou ``,``.
+    """
+    assinatura = arquivo.read(4)
+    arquivo.seek(0)
+    if e_planilha(assinatura):
+        from python_calamine import CalamineWorkbook
+
+        sheet = CalamineWorkbook.from_filelike(arquivo).get_sheet_by_index(0)
+        yield from sheet.iter_rows()
+        return
+
+    texto = io.TextIOWrapper(arquivo, encoding=encoding, newline="")
+    cabecalho = texto.readline()
+    delimitador = ";" if cabecalho.count(";") >= cabecalho.count(",") else ","
+    yield from csv.reader(chain([cabecalho], texto), delimiter=delimitador)
+
+
+def _normalizar(valor: Any) -> str:
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor if valor is not None else "").strip()
+
+
+@dataclass
+class RelatorioImportacao:
+    """Diff de uma importação (ou simulação) de mapeamentos."""
+
+    dry_run: bool
+    novos: int = 0
+    alterados: int = 0
+    inalterados: int = 0
+    invalidos: int = 0
+    alteracoes: list[dict] = field(default_factory=list)
+    erros: list[dict] = field(default_factory=list)
+    protocolos_reprocessados: list[str] = field(default_factory=list)
+    # Falha do banco no meio da gravação: os lotes anteriores ficam confirmados.
+    erro_gravacao: Optional[str] = None
+
+    def registrar_erro(self, linha: int, motivo: str) -> None:
+        self.invalidos += 1
+        if len(self.erros) < _MAX_DETALHES:
+            self.erros.append({"linha": linha, "motivo": motivo})
+
+    def registrar_alteracao(
+        self, tipo: str, conta: str, de: Optional[str], para: str
+    ) -> None:
+        if de is None:
+            self.novos += 1
+        else:
+            self.alterados += 1
+        if len(self.alteracoes) < _MAX_DETALHES:
+            self.alteracoes.append(
+                {"tipo": tipo, "conta_cliente": conta, "de": de, "para": para}
+            )
+
+    def como_dict(self) -> dict:
+        return asdict(self)
+
+
+class MapeamentoImporter:
+    """Responsabilidade única: upsert em lote de mapeamentos de um CNPJ."""
+
+    def __init__(self, db: AsyncSession, tamanho_lote: int = 500) -> None:
+        self._db = db
+        self._repo = AccountMappingRepository(db)
+        self._indice = PendenciaContaRepository(db)
+        self._tamanho_lote = tamanho_lote
+        self.protocolos_afetados: set[int] = set()
+
+    async def importar(
+        self, cnpj: str, linhas: Iterable[list[Any]], dry_run: bool = False
+    ) -> RelatorioImportacao:
+        relatorio = RelatorioImportacao(dry_run=dry_run)
+        # O arquivo inteiro é lido e validado antes da primeira gravação: erro de
+        # encoding ou planilha corrompida no meio não deixa importação parcial.
+        validas = self._validar(linhas, relatorio)
+        for inicio in range(0, len(validas), self._tamanho_lote):
+            try:
+                await self._aplicar_lote(
+                    cnpj, validas[inicio : inicio + self._tamanho_lote], relatorio
+                )
+            except SQLAlchemyError as e:
+                await self._db.rollback()
+                relatorio.erro_gravacao = (
+                    f"Gravação interrompida após {inicio} de {len(validas)} mapeamentos: {e}"
+                )
+                break
+        return relatorio
+
+    def _validar(
+        self, linhas: Iterable[list[Any]], relatorio: RelatorioImportacao
+    ) -> list[tuple[str, str, str]]:
+        iterador = iter(linhas)
+        indices = self._indices_cabecalho(next(iterador, None))
+
+        vistos: set[tuple[str, str]] = set()
+        validas: list[tuple[str, str, str]] = []
+        for num_linha, row in enumerate(iterador, start=2):
+            valores = [
+                _normalizar(row[i]) if i < len(row) else "" for i in indices
+            ]
+            conta, destino, tipo = valores[0], valores[1], valores[2].upper()
+            if not any(valores):
+                continue
+            if not conta or not destino:
+                relatorio.registrar_erro(num_linha, "Conta cliente/contabilidade vazia.")
+                continue
+            if tipo not in TIPOS:
+                relatorio.registrar_erro(num_linha, f"Tipo inválido: '{valores[2]}'.")
+                continue
+            if (tipo, conta) in vistos:
+                relatorio.registrar_erro(num_linha, f"Conta {tipo}:{conta} repetida no arquivo.")
+                continue
+            vistos.add((tipo, conta))
+            validas.append((conta, destino, tipo))
+        return validas
+
+    async def _aplicar_lote(
+        self,
+        cnpj: str,
+        lote: list[tuple[str, str, str]],
+        relatorio: RelatorioImportacao,
+    ) -> None:
+        for tipo in TIPOS:
+            do_tipo = [(c, d) for c, d, t in lote if t == tipo]
+            existentes = await self._repo.buscar_em_lote(
+                cnpj, tipo, [c for c, _ in do_tipo]
+            )
+            gravar: dict[str, str] = {}
+            for conta, destino in do_tipo:
+                atual = existentes.get(conta)
+                if atual and atual.conta_contabilidade == destino:
+                    relatorio.inalterados += 1
+                    continue
+                relatorio.registrar_alteracao(
+                    tipo, conta, atual.conta_contabilidade if atual else None, destino
+                )
+                gravar[conta] = destino
+            if not relatorio.dry_run:
+                await self._repo.gravar_em_lote(cnpj, tipo, gravar)
+        if relatorio.dry_run:
+            return
+        await self._db.commit()
+        for conta, destino, tipo in lote:
+            indice_sugestoes.registrar(cnpj, tipo, conta, destino)
+        for tipo in TIPOS:
+            self.protocolos_afetados |= await self._indice.resolver_contas(
+                cnpj, tipo, [c for c, _, t in lote if t == tipo]
+            )
+
+    @staticmethod
+    def _indices_cabecalho(cabecalho: Optional[list[Any]]) -> list[int]:
+        if not cabecalho:
+            raise ArquivoMapeamentoInvalidoError("Arquivo de mapeamento vazio.")
+        nomes = [_normalizar(c).lower() for c in cabecalho]
+        faltantes = [c for c in COLUNAS if c not in nomes]
+        if faltantes:
+            raise ArquivoMapeamentoInvalidoError(
+                f"Colunas obrigatórias ausentes: {', '.join(faltantes)}. "
+                f"Esperado: {';'.join(COLUNAS)}."
+            )
+        return [nomes.index(c) for c in COLUNAS]
+
+
+async def exportar_csv(
+    db: AsyncSession, cnpj: str, delimitador: str = ";"
+) -> AsyncIterator[str]:
+    """Gera o CSV de mapeamentos do CNPJ em blocos, no formato da importação."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimitador, lineterminator="\n")
+    writer.writerow(COLUNAS)
+    async for m in AccountMappingRepository(db).iterar_por_cnpj(cnpj):
+        writer.writerow((m.conta_cliente, m.conta_contabilidade, m.tipo))
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
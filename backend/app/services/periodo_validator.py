@@ -1,7 +1,10 @@
 """Validação de período contábil."""
+import calendar
 from datetime import datetime
+from typing import Optional
 
 from app.core.exceptions import LancamentoForaDoPeriodoError, PeriodoInvalidoError
+from app.services.row_batch import RowBatch
 
 
 class PeriodoValidator:
@@ -34,6 +37,28 @@ class PeriodoValidator:
         except (ValueError, AttributeError):
             return False
 
+    def validar_lote(
+        self, batch: RowBatch, linha_inicial: int = 2, limite: Optional[int] = None
+    ) -> list[tuple[int, str]]:
+        """Retorna (linha, data) de cada linha do lote fora do período.
+
+        Com ``limite``, para de varrer o lote ao atingir esse número de erros.
+        """
+        ano, mes = self._periodo
+        base = (ano * 100 + mes) * 100
+        ultimo_dia = calendar.monthrange(ano, mes)[1]
+        erros: list[tuple[int, str]] = []
+        for idx, data in enumerate(batch.datas):
+            if 1 <= data - base <= ultimo_dia:
+                continue
+            data_fmt = batch.data_formatada(idx)
+            if not data and self.validar_data(data_fmt):
+                continue
+            erros.append((idx + linha_inicial, data_fmt))
+            if limite is not None and len(erros) >= limite:
+                break
+        return erros
+
     def validar_ou_falhar(self, erros: list[tuple[int, str]]) -> None:
         """Lança LancamentoForaDoPeriodoError se houver erros acumulados."""
         if not erros:
@@ -0,0 +1,104 @@
+"""Pré-validação síncrona de um arquivo, sem criar protocolo."""
+import asyncio
+import time
+from itertools import chain
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import LayoutNaoEncontradoError
+from app.repositories.layout_excel_repository import LayoutExcelRepository
+from app.services.conta_mapper import ContaMapper
+from app.services.excel_parser import ExcelParser, OpcoesCsv
+from app.services.periodo_validator import PeriodoValidator
+
+_TAMANHO_LOTE = 2000
+_MAX_EXEMPLOS = 20
+
+
+class PreflightService:
+    """Responsabilidade única: antecipar erros de período e contas sem mapa.
+
+    Lê o arquivo em lotes e para cedo quando acha ``max_erros`` erros de
+    período ou estoura o orçamento de tempo; nesse caso o relatório vem com
+    ``completo=False``. Contas sem mapa param de ser listadas em ``max_erros``
+    (``contas_sem_mapeamento_truncado``) sem interromper a leitura das datas.
+    """
+
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def executar(
+        self,
+        cnpj: str,
+        periodo: str,
+        layout_nome: str,
+        arquivo_base64: str,
+        max_erros: int = 50,
+        orcamento_s: float = 3.0,
+    ) -> dict:
+        inicio = time.monotonic()
+        prazo = inicio + orcamento_s
+        layouts = LayoutExcelRepository(self._db)
+        layout, opcoes_csv = await layouts.buscar_com_opcoes_csv(layout_nome)
+        if not layout:
+            raise LayoutNaoEncontradoError(layout_nome)
+        abas = await layouts.buscar_abas(layout.id)
+        validator = PeriodoValidator(periodo)
+        mapper = ContaMapper(cnpj, self._db)
+        parser = ExcelParser(layout, OpcoesCsv.do_layout(opcoes_csv), abas)
+        lotes = parser.iterar_lotes(arquivo_base64, _TAMANHO_LOTE)
+
+        erros_periodo: list[tuple[int, str]] = []
+        sem_mapa: set[str] = set()
+        linhas = 0
+        descartadas = 0
+        por_aba: dict[str, int] = {}
+        motivo: Optional[str] = None
+        while True:
+            batch = await asyncio.to_thread(next, lotes, None)
+            if batch is None:
+                break
+            # Cada categoria tem seu próprio limite: contas sem mapa param de ser
+            # coletadas em max_erros, mas as datas continuam sendo conferidas.
+            erros_periodo += validator.validar_lote(
+                batch, linha_inicial=linhas + 2, limite=max_erros - len(erros_periodo)
+            )
+            linhas += len(batch)
+            descartadas += batch.descartadas
+            for nome, lidas, _ in batch.abas:
+                por_aba[nome] = por_aba.get(nome, 0) + lidas
+            if len(sem_mapa) < max_erros:
+                debitos, creditos = await mapper.resolver_lote(batch)
+                for conta in chain(
+                    (f"DEBITO:{batch.contas[c]}" for c, m in debitos.items() if not m),
+                    (f"CREDITO:{batch.contas[c]}" for c, m in creditos.items() if not m),
+                ):
+                    if len(sem_mapa) >= max_erros:
+                        break
+                    sem_mapa.add(conta)
+            if len(erros_periodo) >= max_erros:
+                motivo = "limite_erros"
+                break
+            if time.monotonic() >= prazo:
+                motivo = "tempo"
+                break
+        lotes.close()
+
+        return {
+            "sucesso": True,
+            "valido": not erros_periodo,
+            "aguardara_mapeamento": bool(sem_mapa),
+            "completo": motivo is None,
+            "motivo_interrupcao": motivo,
+            "linhas_lidas": linhas,
+            "linhas_descartadas": descartadas,
+            "linhas_por_aba": por_aba,
+            "erros_periodo": {
+                "total": len(erros_periodo),
+                "exemplos": [f"Linha {l}: {d}" for l, d in erros_periodo[:_MAX_EXEMPLOS]],
+            },
+            "contas_sem_mapeamento": sorted(sem_mapa),
+            "contas_sem_mapeamento_truncado": len(sem_mapa) >= max_erros,
+            "tempo_ms": round((time.monotonic() - inicio) * 1000, 1),
+        }
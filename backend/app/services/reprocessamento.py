@@ -0,0 +1,94 @@
+"""Detecção de protocolos WAITING_MAPPING liberados por novos mapeamentos."""
+from typing import Iterable
+
+from sqlalchemy import and_, delete, exists, insert, literal, not_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.account_mapping import AccountMapping
+from app.models.pendencia_conta import PendenciaConta
+from app.models.protocolo import Protocolo
+from app.models.staging_entry import StagingEntry
+from app.repositories.pendencia_conta_repository import PendenciaContaRepository
+
+# O layout não é persistido no protocolo; reprocessamentos usam o padrão.
+LAYOUT_PADRAO = "layout_brastelha_1"
+
+
+class ReprocessamentoService:
+    """Responsabilidade única: liberar protocolos cujas contas já estão mapeadas."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self._db = db
+
+    async def protocolos_liberados(self, protocolo_ids: Iterable[int]) -> list[Protocolo]:
+        """Dentre os candidatos, os WAITING_MAPPING sem pendência no índice."""
+        ids = list(protocolo_ids)
+        if not ids:
+            return []
+        stmt = select(Protocolo).where(
+            Protocolo.id.in_(ids),
+            Protocolo.status == "WAITING_MAPPING",
+            not_(exists().where(PendenciaConta.protocolo_id == Protocolo.id)),
+        )
+        return list((await self._db.execute(stmt)).scalars().all())
+
+    async def preparar(self, protocolos: list[Protocolo]) -> list[Protocolo]:
+        """Remove staging e marca PENDING; retorna os que podem ser reprocessados."""
+        prontos = [p for p in protocolos if p.arquivo_base64_raw]
+        if not prontos:
+            return []
+        ids = [p.id for p in prontos]
+        await self._db.execute(
+            delete(StagingEntry).where(StagingEntry.protocolo_id.in_(ids))
+        )
+        await PendenciaContaRepository(self._db).remover_por_protocolos(ids)
+        for p in prontos:
+            p.status = "PENDING"
+        await self._db.commit()
+        return prontos
+
+    async def indexar_pendencias_legadas(self) -> int:
+        """Popula o índice de protocolos WAITING_MAPPING criados antes dele existir."""
+        ids = list(
+            (
+                await self._db.execute(
+                    select(Protocolo.id).where(
+                        Protocolo.status == "WAITING_MAPPING",
+                        not_(exists().where(PendenciaConta.protocolo_id == Protocolo.id)),
+                        exists().where(StagingEntry.protocolo_id == Protocolo.id),
+                    )
+                )
+            ).scalars().all()
+        )
+        if not ids:
+            return 0
+        for coluna, tipo in [
+            (StagingEntry.conta_debito_raw, "DEBITO"),
+            (StagingEntry.conta_credito_raw, "CREDITO"),
+        ]:
+            origem = (
+                select(StagingEntry.protocolo_id, Protocolo.cnpj, literal(tipo), coluna)
+                .join(Protocolo, Protocolo.id == StagingEntry.protocolo_id)
+                .where(
+                    StagingEntry.protocolo_id.in_(ids),
+                    not_(self._mapeada(coluna, tipo)),
+                )
+                .distinct()
+            )
+            await self._db.execute(
+                insert(PendenciaConta).from_select(
+                    ["protocolo_id", "cnpj_empresa", "tipo", "conta_cliente"], origem
+                )
+            )
+        await self._db.commit()
+        return len(ids)
+
+    @staticmethod
+    def _mapeada(coluna, tipo: str):
+        return exists().where(
+            and_(
+                AccountMapping.cnpj_empresa == Protocolo.cnpj,
+                AccountMapping.conta_cliente == coluna,
+                AccountMapping.tipo == tipo,
+            )
+        )
@@ -0,0 +1,280 @@
+"""Retenção: arquivamento de blobs antigos, limpeza de staging e vacuum incremental.
+
+Todo o trabalho é feito em passos pequenos com orçamento de tempo, para que o
+servidor (SQLite, processo único) nunca fique parado num VACUUM completo.
+"""
+import asyncio
+import base64
+import os
+import time
+import zipfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import delete, exists, not_, or_, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DATA_DIR, engine
+from app.models.pendencia_conta import PendenciaConta
+from app.models.protocolo import Protocolo
+from app.models.protocolo_arquivado import ProtocoloArquivado
+from app.models.staging_entry import StagingEntry
+from app.services.excel_parser import extensao_arquivo
+
+ARCHIVE_DIR = Path(os.environ.get("ARCHIVE_DIR") or DATA_DIR / "archive")
+
+_NOME_RAW = "original.{}"  # extensão do formato enviado (xlsx, ods, csv...)
+_NOME_TXT = "resultado.txt"
+_STATUS_FINALIZADOS = ("COMPLETED", "ERROR")
+
+
+def _env_int(nome: str, padrao: int) -> int:
+    return int(os.environ.get(nome) or padrao)
+
+
+@dataclass
+class PoliticaRetencao:
+    """Idade (dias) a partir da qual os blobs de cada status são arquivados.
+
+    Status fora do dicionário (PENDING, WAITING_MAPPING) nunca são arquivados:
+    o arquivo original ainda é necessário para reprocessar.
+    """
+
+    dias_por_status: dict[str, int] = field(default_factory=dict)
+    protocolos_por_lote: int = 20
+    staging_por_lote: int = 2000
+    paginas_por_lote: int = 256
+
+    @classmethod
+    def do_ambiente(cls) -> "PoliticaRetencao":
+        return cls(
+            dias_por_status={
+                "COMPLETED": _env_int("RETENCAO_DIAS_COMPLETED", 90),
+                "ERROR": _env_int("RETENCAO_DIAS_ERROR", 30),
+            }
+        )
+
+
+@dataclass
+class ResultadoRetencao:
+    arquivados: int = 0
+    bytes_liberados: int = 0
+    staging_removidos: int = 0
+    paginas_liberadas: int = 0
+    concluido: bool = True
+
+    def como_dict(self) -> dict:
+        return asdict(self)
+
+
+class RetencaoService:
+    """Responsabilidade única: aplicar a política de retenção em passos curtos."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        politica: Optional[PoliticaRetencao] = None,
+        archive_dir: Path = ARCHIVE_DIR,
+    ) -> None:
+        self._db = db
+        self._politica = politica or PoliticaRetencao.do_ambiente()
+        self._archive_dir = archive_dir
+
+    async def executar_passo(self, orcamento_s: float = 0.5) -> ResultadoRetencao:
+        """Arquiva, limpa staging e faz vacuum até esgotar ``orcamento_s``."""
+        prazo = time.monotonic() + orcamento_s
+        resultado = ResultadoRetencao()
+        resultado.concluido = (
+            await self.arquivar(prazo, resultado)
+            and await self.purgar_staging(prazo, resultado)
+            and await vacuum_incremental(
+                self._db.bind, prazo, resultado, self._politica.paginas_por_lote
+            )
+        )
+        return resultado
+
+    async def arquivar(self, prazo: float, resultado: ResultadoRetencao) -> bool:
+        """Move raw/TXT vencidos para o arquivo morto; retorna True se não sobrou nada."""
+        filtro = self._filtro_vencidos()
+        if filtro is None:
+            return True
+        while time.monotonic() < prazo:
+            protocolos = (
+                await self._db.execute(
+                    select(Protocolo)
+                    .where(filtro)
+                    .order_by(Protocolo.created_at)
+                    .limit(self._politica.protocolos_por_lote)
+                )
+            ).scalars().all()
+            if not protocolos:
+                return True
+            for p in protocolos:
+                caminho, tamanho = await asyncio.to_thread(self._gravar_arquivo, p)
+                self._db.add(
+                    ProtocoloArquivado(
+                        protocolo_id=p.id, caminho=caminho, bytes_originais=tamanho
+                    )
+                )
+                p.arquivo_base64_raw = None
+                p.arquivo_txt_base64 = None
+                resultado.arquivados += 1
+                resultado.bytes_liberados += tamanho
+            await self._db.commit()
+        return False
+
+    async def purgar_staging(self, prazo: float, resultado: ResultadoRetencao) -> bool:
+        """Remove staging/índice de protocolos finalizados ou inexistentes."""
+        for modelo in (StagingEntry, PendenciaConta):
+            sem_pendencia = or_(
+                not_(exists().where(Protocolo.id == modelo.protocolo_id)),
+                exists().where(
+                    Protocolo.id == modelo.protocolo_id,
+                    Protocolo.status.in_(_STATUS_FINALIZADOS),
+                ),
+            )
+            while True:
+                if time.monotonic() >= prazo:
+                    return False
+                ids = select(modelo.id).where(sem_pendencia).limit(
+                    self._politica.staging_por_lote
+                )
+                removidos = (
+                    await self._db.execute(delete(modelo).where(modelo.id.in_(ids)))
+                ).rowcount
+                await self._db.commit()
+                if modelo is StagingEntry:
+                    resultado.staging_removidos += removidos
+                if removidos < self._politica.staging_por_lote:
+                    break
+        return True
+
+    async def carregar_txt(self, protocolo: Protocolo) -> Optional[str]:
+        """TXT (base64) do protocolo, buscando no arquivo morto se já arquivado."""
+        if protocolo.arquivo_txt_base64:
+            return protocolo.arquivo_txt_base64
+        arquivado = (
+            await self._db.execute(
+                select(ProtocoloArquivado).where(
+                    ProtocoloArquivado.protocolo_id == protocolo.id
+                )
+            )
+        ).scalar_one_or_none()
+        if not arquivado:
+            return None
+
+        def _ler() -> Optional[str]:
+            with zipfile.ZipFile(self._archive_dir / arquivado.caminho) as zf:
+                if _NOME_TXT not in zf.namelist():
+                    return None
+                return base64.b64encode(zf.read(_NOME_TXT)).decode()
+
+        return await asyncio.to_thread(_ler)
+
+    async def remover_arquivo(self, protocolo_id: int) -> None:
+        """Apaga do disco o arquivo morto do protocolo (os metadados saem com ele)."""
+        caminho = (
+            await self._db.execute(
+                select(ProtocoloArquivado.caminho).where(
+                    ProtocoloArquivado.protocolo_id == protocolo_id
+                )
+            )
+        ).scalar_one_or_none()
+        if caminho:
+            (self._archive_dir / caminho).unlink(missing_ok=True)
+
+    def _filtro_vencidos(self):
+        agora = datetime.utcnow()
+        por_status = [
+            (Protocolo.status == status)
+            & (Protocolo.created_at < agora - timedelta(days=dias))
+            for status, dias in self._politica.dias_por_status.items()
+        ]
+        if not por_status:
+            return None
+        return (
+            or_(*por_status)
+            & or_(
+                Protocolo.arquivo_base64_raw.is_not(None),
+                Protocolo.arquivo_txt_base64.is_not(None),
+            )
+            & not_(exists().where(ProtocoloArquivado.protocolo_id == Protocolo.id))
+        )
+
+    def _gravar_arquivo(self, protocolo: Protocolo) -> tuple[str, int]:
+        relativo = Path(protocolo.created_at.strftime("%Y-%m")) / f"{protocolo.id}.zip"
+        destino = self._archive_dir / relativo
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tamanho = 0
+        temporario = destino.with_suffix(".tmp")
+        with zipfile.ZipFile(temporario, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for nome, conteudo in (
+                (_NOME_RAW, protocolo.arquivo_base64_raw),
+                (_NOME_TXT, protocolo.arquivo_txt_base64),
+            ):
+                if conteudo:
+                    tamanho += len(conteudo)
+                    dados = base64.b64decode(conteudo.split(",")[-1])
+                    zf.writestr(nome.format(extensao_arquivo(dados)), dados)
+        temporario.replace(destino)
+        return relativo.as_posix(), tamanho
+
+
+async def vacuum_incremental(
+    bind: AsyncEngine,
+    prazo: float,
+    resultado: ResultadoRetencao,
+    paginas_por_lote: int = 256,
+) -> bool:
+    """Devolve páginas livres ao SO e faz checkpoint do WAL, dentro do prazo.
+
+    Requer ``auto_vacuum=INCREMENTAL`` (bancos criados por ``init_db``); em
+    bancos antigos é um no-op até um ``python -m app.cli retencao --vacuum-completo``.
+    """
+    async with bind.connect() as conn:
+        if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != 2:
+            return True
+        while True:
+            if time.monotonic() >= prazo:
+                return False
+            livres = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+            if not livres:
+                break
+            # O driver avança só um passo por execute: 1 página por chamada.
+            lote = min(livres, paginas_por_lote)
+            for _ in range(lote):
+                await conn.exec_driver_sql("PRAGMA incremental_vacuum(1)")
+            resultado.paginas_liberadas += lote
+        await conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+    return True
+
+
+async def vacuum_completo() -> None:
+    """VACUUM completo, convertendo o banco para auto_vacuum incremental.
+
+    Bloqueia o banco durante a execução: usar apenas em janela de manutenção.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        await conn.exec_driver_sql("VACUUM")
+        await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+async def agendador_retencao(
+    intervalo_s: Optional[float] = None, orcamento_s: Optional[float] = None
+) -> None:
+    """Laço de fundo do lifespan: um passo curto de retenção a cada intervalo."""
+    intervalo = intervalo_s or float(os.environ.get("RETENCAO_INTERVALO_S") or 300)
+    orcamento = orcamento_s or float(os.environ.get("RETENCAO_ORCAMENTO_S") or 0.5)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            async with async_session() as db:
+                await RetencaoService(db).executar_passo(orcamento)
+        except Exception as e:
+            print(f"❌ ERRO [retenção]: {e}")
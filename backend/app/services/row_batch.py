@@ -0,0 +1,195 @@
+"""Representação colunar compacta das linhas extraídas do Excel."""
+from array import array
+from typing import Iterator, Optional
+
+
+class StringPool:
+    """Dicionário de strings: cada valor distinto é armazenado uma única vez."""
+
+    __slots__ = ("_valores", "_codigos")
+
+    def __init__(self) -> None:
+        self._valores: list[str] = []
+        self._codigos: dict[str, int] = {}
+
+    def codificar(self, valor: str) -> int:
+        codigo = self._codigos.get(valor)
+        if codigo is None:
+            codigo = len(self._valores)
+            self._valores.append(valor)
+            self._codigos[valor] = codigo
+        return codigo
+
+    def __getitem__(self, codigo: int) -> str:
+        return self._valores[codigo]
+
+    def __len__(self) -> int:
+        return len(self._valores)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._valores)
+
+
+def empacotar_data(dia: int, mes: int, ano: int) -> int:
+    """Codifica uma data como inteiro AAAAMMDD."""
+    return ano * 10000 + mes * 100 + dia
+
+
+def desempacotar_data(data: int) -> tuple[int, int, int]:
+    """Retorna (dia, mes, ano) de um inteiro AAAAMMDD."""
+    return data % 100, (data // 100) % 100, data // 10000
+
+
+class LinhaBruta:
+    """Visão de uma linha de um RowBatch, sem enriquecimento."""
+
+    __slots__ = ("_batch", "_idx")
+
+    def __init__(self, batch: "RowBatch", idx: int) -> None:
+        self._batch = batch
+        self._idx = idx
+
+    @property
+    def data_formatada(self) -> str:
+        return self._batch.data_formatada(self._idx)
+
+    @property
+    def valor(self) -> float:
+        return self._batch.valores[self._idx]
+
+    @property
+    def conta_debito_raw(self) -> str:
+        return self._batch.contas[self._batch.debitos[self._idx]]
+
+    @property
+    def conta_credito_raw(self) -> str:
+        return self._batch.contas[self._batch.creditos[self._idx]]
+
+    @property
+    def historico(self) -> str:
+        return self._batch.textos[self._batch.historicos[self._idx]]
+
+    @property
+    def cod_historico(self) -> str:
+        return self._batch.textos[self._batch.cod_historicos[self._idx]]
+
+
+class RowBatch:
+    """Lote colunar de linhas brutas.
+
+    Valores ficam em ``array('d')``, datas como inteiros AAAAMMDD e contas,
+    históricos e códigos de histórico como códigos de um StringPool. Datas que
+    não puderam ser interpretadas são guardadas como texto em ``datas_brutas``
+    (com 0 na coluna ``datas``) e reprovadas pela validação de período.
+    ``descartadas`` conta as linhas que o parser não conseguiu converter e
+    ``abas`` guarda (aba, linhas, descartadas) de cada aba lida, em ordem.
+    """
+
+    __slots__ = (
+        "datas",
+        "valores",
+        "debitos",
+        "creditos",
+        "historicos",
+        "cod_historicos",
+        "datas_brutas",
+        "contas",
+        "textos",
+        "descartadas",
+        "abas",
+    )
+
+    def __init__(
+        self,
+        contas: Optional[StringPool] = None,
+        textos: Optional[StringPool] = None,
+    ) -> None:
+        self.datas = array("i")
+        self.valores = array("d")
+        self.debitos = array("I")
+        self.creditos = array("I")
+        self.historicos = array("I")
+        self.cod_historicos = array("I")
+        self.datas_brutas: dict[int, str] = {}
+        self.contas = contas if contas is not None else StringPool()
+        self.textos = textos if textos is not None else StringPool()
+        self.descartadas = 0
+        self.abas: list[tuple[str, int, int]] = []
+
+    def adicionar(
+        self,
+        data: int | str,
+        valor: float,
+        conta_debito: str,
+        conta_credito: str,
+        historico: str,
+        cod_historico: str,
+    ) -> None:
+        """Acrescenta uma linha. ``data`` é AAAAMMDD ou o texto original."""
+        if isinstance(data, str):
+            self.datas_brutas[len(self.datas)] = data
+            data = 0
+        self.datas.append(data)
+        self.valores.append(valor)
+        self.debitos.append(self.contas.codificar(conta_debito))
+        self.creditos.append(self.contas.codificar(conta_credito))
+        self.historicos.append(self.textos.codificar(historico))
+        self.cod_historicos.append(self.textos.codificar(cod_historico))
+
+    def recodificar(self, contas: StringPool, textos: StringPool) -> None:
+        """Passa as colunas codificadas para os pools ``contas`` e ``textos``.
+
+        Usado ao juntar lotes montados com pools próprios (uma aba por thread).
+        """
+        tabela = array("I", map(contas.codificar, self.contas)).__getitem__
+        self.debitos = array("I", map(tabela, self.debitos))
+        self.creditos = array("I", map(tabela, self.creditos))
+        tabela = array("I", map(textos.codificar, self.textos)).__getitem__
+        self.historicos = array("I", map(tabela, self.historicos))
+        self.cod_historicos = array("I", map(tabela, self.cod_historicos))
+        self.contas, self.textos = contas, textos
+
+    def anexar(self, outro: "RowBatch", inicio: int = 0, fim: Optional[int] = None) -> None:
+        """Acrescenta as linhas ``[inicio, fim)`` de ``outro`` (mesmos pools).
+
+        ``descartadas`` e ``abas`` ficam a cargo de quem chama.
+        """
+        if outro.contas is not self.contas or outro.textos is not self.textos:
+            raise ValueError("RowBatch.anexar exige os mesmos StringPools; use recodificar.")
+        fim = len(outro) if fim is None else fim
+        deslocamento = len(self) - inicio
+        for idx, texto in outro.datas_brutas.items():
+            if inicio <= idx < fim:
+                self.datas_brutas[idx + deslocamento] = texto
+        self.datas.extend(outro.datas[inicio:fim])
+        self.valores.extend(outro.valores[inicio:fim])
+        self.debitos.extend(outro.debitos[inicio:fim])
+        self.creditos.extend(outro.creditos[inicio:fim])
+        self.historicos.extend(outro.historicos[inicio:fim])
+        self.cod_historicos.extend(outro.cod_historicos[inicio:fim])
+
+    def registrar_aba(self, nome: str, inicio: int, descartadas_antes: int) -> None:
+        """Fecha a contagem da aba ``nome``, lida a partir da linha ``inicio``."""
+        self.abas.append((nome, len(self) - inicio, self.descartadas - descartadas_antes))
+
+    def data_formatada(self, idx: int) -> str:
+        """Data da linha no formato DD/MM/YYYY (ou o texto original)."""
+        data = self.datas[idx]
+        if not data:
+            return self.datas_brutas.get(idx, "")
+        dia, mes, ano = desempacotar_data(data)
+        return f"{dia:02d}/{mes:02d}/{ano}"
+
+    def __len__(self) -> int:
+        return len(self.datas)
+
+    def __getitem__(self, idx: int) -> LinhaBruta:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return LinhaBruta(self, idx)
+
+    def __iter__(self) -> Iterator[LinhaBruta]:
+        for idx in range(len(self)):
+            yield LinhaBruta(self, idx)
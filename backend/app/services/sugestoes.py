@@ -0,0 +1,280 @@
+"""Índice em memória de sugestões de conta contábil para pendências."""
+import heapq
+import math
+import re
+from collections import defaultdict
+from datetime import datetime
+from operator import itemgetter
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.account_mapping import AccountMapping
+from app.models.protocolo import Protocolo
+from app.models.staging_entry import StagingEntry
+
+# Peso dobra a cada _MEIA_VIDA_S de recência em last_used. A referência é fixa
+# para que pesos gravados em momentos diferentes continuem comparáveis.
+_REFERENCIA_S = datetime(2024, 1, 1).timestamp()
+_MEIA_VIDA_S = 90 * 86400
+_MIN_PREFIXO = 2
+_TERMO = re.compile(r"[A-Za-zÀ-ÿ]{3,}")
+_MAX_HISTORICOS = 50
+
+# Contribuição de cada fonte no score final.
+_PESO_EXATA = 4.0
+_PESO_GRUPO = 2.0
+_PESO_PREFIXO = 1.0
+_PESO_HISTORICO = 2.0
+
+
+def _peso(last_used: Optional[datetime]) -> float:
+    ts = (last_used or datetime.utcnow()).timestamp()
+    return 2 ** ((ts - _REFERENCIA_S) / _MEIA_VIDA_S)
+
+
+def _termos(texto: str) -> set[str]:
+    return {t.upper() for t in _TERMO.findall(texto or "")}
+
+
+def _top(pesos: dict[str, float], n: int) -> list[tuple[str, float]]:
+    return heapq.nlargest(n, pesos.items(), key=itemgetter(1))
+
+
+class _No:
+    __slots__ = ("filhos", "pesos")
+
+    def __init__(self) -> None:
+        self.filhos: dict[str, "_No"] = {}
+        self.pesos: dict[str, float] = {}
+
+
+class _Trie:
+    """Trie de prefixos; cada nó soma o peso de cada candidato abaixo dele."""
+
+    def __init__(self) -> None:
+        self._raiz = _No()
+
+    def somar(self, chave: str, candidato: str, peso: float) -> None:
+        no = self._raiz
+        for ch in chave:
+            no = no.filhos.setdefault(ch, _No())
+            total = no.pesos.get(candidato, 0.0) + peso
+            if total > 1e-9:
+                no.pesos[candidato] = total
+            else:
+                no.pesos.pop(candidato, None)
+
+    def caminho(self, chave: str) -> Iterable[tuple[int, _No]]:
+        """Nós (profundidade, nó) ao longo de ``chave``, até onde existirem."""
+        no = self._raiz
+        for profundidade, ch in enumerate(chave, start=1):
+            no = no.filhos.get(ch)
+            if no is None:
+                return
+            yield profundidade, no
+
+    def no(self, prefixo: str) -> Optional[_No]:
+        encontrado = None
+        for profundidade, no in self.caminho(prefixo):
+            if profundidade == len(prefixo):
+                encontrado = no
+        return encontrado
+
+
+class IndiceSugestoes:
+    """Responsabilidade única: sugerir contas contábeis para uma conta pendente.
+
+    Combina, por tipo (DEBITO/CREDITO): a mesma conta cliente já mapeada em
+    outros CNPJs (bônus para o mesmo grupo, raiz de 8 dígitos), contas cliente
+    com prefixo comum, termos de histórico já associados a contas contábeis e
+    autocompletar da conta contábil digitada. Pesos crescem com ``last_used``.
+    Atualizado a cada gravação de mapeamento via ``registrar``.
+    """
+
+    def __init__(self) -> None:
+        self.pronto = False
+        # (tipo, conta_cliente) → cnpj → (conta_contabilidade, peso)
+        self._mapeamentos: dict[tuple[str, str], dict[str, tuple[str, float]]] = {}
+        self._por_conta_cliente: dict[str, _Trie] = defaultdict(_Trie)
+        self._por_conta_contabil: dict[str, _Trie] = defaultdict(_Trie)
+        # (tipo, termo) → conta_contabilidade → peso
+        self._por_termo: dict[tuple[str, str], dict[str, float]] = defaultdict(dict)
+
+    def registrar(
+        self,
+        cnpj: str,
+        tipo: str,
+        conta_cliente: str,
+        conta_contabilidade: str,
+        last_used: Optional[datetime] = None,
+    ) -> None:
+        """Inclui ou substitui o mapeamento ``(cnpj, tipo, conta_cliente)``."""
+        por_cnpj = self._mapeamentos.setdefault((tipo, conta_cliente), {})
+        anterior = por_cnpj.get(cnpj)
+        if anterior:
+            self._somar(tipo, conta_cliente, anterior[0], -anterior[1])
+        peso = _peso(last_used)
+        por_cnpj[cnpj] = (conta_contabilidade, peso)
+        self._somar(tipo, conta_cliente, conta_contabilidade, peso)
+
+    def aprender_historicos(
+        self,
+        tipo: str,
+        conta_contabilidade: str,
+        historicos: Iterable[str],
+        last_used: Optional[datetime] = None,
+    ) -> None:
+        """Associa os termos dos históricos à conta contábil escolhida."""
+        peso = _peso(last_used)
+        termos: set[str] = set()
+        for historico in historicos:
+            termos |= _termos(historico)
+        for termo in termos:
+            pesos = self._por_termo[(tipo, termo)]
+            pesos[conta_contabilidade] = pesos.get(conta_contabilidade, 0.0) + peso
+
+    def sugerir(
+        self,
+        cnpj: str,
+        tipo: str,
+        conta_cliente: str,
+        q: str = "",
+        historicos: Iterable[str] = (),
+        limite: int = 10,
+    ) -> list[dict]:
+        """Contas contábeis ordenadas por score, com os motivos de cada uma."""
+        scores: dict[str, float] = defaultdict(float)
+        motivos: dict[str, set[str]] = defaultdict(set)
+        amostra = limite * 3
+
+        def _adicionar(pesos: Iterable[tuple[str, float]], fator: float, motivo: str) -> None:
+            # Normaliza pelo maior peso da fonte: recência ordena dentro dela,
+            # os _PESO_* equilibram as fontes entre si.
+            somados: dict[str, float] = defaultdict(float)
+            for conta, peso in pesos:
+                somados[conta] += peso
+            maximo = max(somados.values(), default=0.0)
+            for conta, peso in somados.items():
+                scores[conta] += fator * peso / maximo
+                motivos[conta].add(motivo)
+
+        grupo = cnpj[:8]
+        exatas = self._mapeamentos.get((tipo, conta_cliente), {})
+        _adicionar(
+            ((c, p) for outro, (c, p) in exatas.items() if outro[:8] != grupo),
+            _PESO_EXATA,
+            "mesma_conta",
+        )
+        _adicionar(
+            ((c, p) for outro, (c, p) in exatas.items() if outro[:8] == grupo and outro != cnpj),
+            _PESO_EXATA + _PESO_GRUPO,
+            "mesmo_grupo",
+        )
+        for profundidade, no in self._por_conta_cliente[tipo].caminho(conta_cliente):
+            if _MIN_PREFIXO <= profundidade < len(conta_cliente):
+                _adicionar(
+                    _top(no.pesos, amostra),
+                    _PESO_PREFIXO * profundidade / len(conta_cliente),
+                    "prefixo",
+                )
+        termos: set[str] = set()
+        for historico in historicos:
+            termos |= _termos(historico)
+        for termo in termos:
+            pesos = self._por_termo.get((tipo, termo))
+            if pesos:
+                # Termos que apontam para muitas contas ("PGTO") dizem pouco.
+                fator = _PESO_HISTORICO / len(termos) / (1 + math.log(len(pesos)))
+                _adicionar(_top(pesos, amostra), fator, "historico")
+
+        if q:
+            for conta in [c for c in scores if not c.startswith(q)]:
+                del scores[conta]
+            no = self._por_conta_contabil[tipo].no(q)
+            if no and len(scores) < limite:
+                _adicionar(_top(no.pesos, amostra), _PESO_PREFIXO / 2, "autocompletar")
+
+        return [
+            {
+                "conta_contabilidade": conta,
+                "score": round(score, 3),
+                "motivos": sorted(motivos[conta]),
+            }
+            for conta, score in heapq.nlargest(limite, scores.items(), key=itemgetter(1))
+        ]
+
+    async def construir(self, db: AsyncSession, tamanho_lote: int = 5000) -> None:
+        """Carrega todos os mapeamentos e os históricos em staging já mapeados."""
+        mapeamentos = await db.stream_scalars(
+            select(AccountMapping).execution_options(yield_per=tamanho_lote)
+        )
+        async for m in mapeamentos:
+            self.registrar(
+                m.cnpj_empresa, m.tipo, m.conta_cliente, m.conta_contabilidade, m.last_used
+            )
+
+        entries = await db.stream(
+            select(
+                Protocolo.cnpj,
+                StagingEntry.conta_debito_raw,
+                StagingEntry.conta_credito_raw,
+                StagingEntry.historico,
+            )
+            .join(Protocolo, Protocolo.id == StagingEntry.protocolo_id)
+            .execution_options(yield_per=tamanho_lote)
+        )
+        async for cnpj, debito, credito, historico in entries:
+            for tipo, conta in (("DEBITO", debito), ("CREDITO", credito)):
+                mapeada = self._mapeamentos.get((tipo, conta), {}).get(cnpj)
+                if mapeada:
+                    self.aprender_historicos(tipo, mapeada[0], [historico])
+        self.pronto = True
+
+    def _somar(self, tipo: str, conta_cliente: str, conta_contabilidade: str, peso: float) -> None:
+        self._por_conta_cliente[tipo].somar(conta_cliente, conta_contabilidade, peso)
+        self._por_conta_contabil[tipo].somar(conta_contabilidade, conta_contabilidade, peso)
+
+
+async def historicos_pendentes(
+    db: AsyncSession, protocolo_id: int, tipo: str, conta_cliente: str
+) -> list[str]:
+    """Históricos (distintos) dos lançamentos em staging que usam a conta."""
+    coluna = (
+        StagingEntry.conta_debito_raw if tipo == "DEBITO" else StagingEntry.conta_credito_raw
+    )
+    return list(
+        (
+            await db.execute(
+                select(StagingEntry.historico)
+                .where(StagingEntry.protocolo_id == protocolo_id, coluna == conta_cliente)
+                .distinct()
+                .limit(_MAX_HISTORICOS)
+            )
+        ).scalars().all()
+    )
+
+
+async def historicos_por_conta(
+    db: AsyncSession, protocolo_id: int
+) -> dict[tuple[str, str], list[str]]:
+    """Como ``historicos_pendentes``, para todas as contas do protocolo de uma vez."""
+    resultado: dict[tuple[str, str], list[str]] = defaultdict(list)
+    linhas = await db.execute(
+        select(
+            StagingEntry.conta_debito_raw,
+            StagingEntry.conta_credito_raw,
+            StagingEntry.historico,
+        )
+        .where(StagingEntry.protocolo_id == protocolo_id)
+        .distinct()
+    )
+    for debito, credito, historico in linhas:
+        for chave in (("DEBITO", debito), ("CREDITO", credito)):
+            if len(resultado[chave]) < _MAX_HISTORICOS:
+                resultado[chave].append(historico)
+    return resultado
+
+
+indice_sugestoes = IndiceSugestoes()
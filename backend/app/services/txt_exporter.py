@@ -0,0 +1,51 @@
+"""Geração do TXT de importação contábil (Registro 6100)."""
+import base64
+from typing import Optional
+
+from app.services.row_batch import RowBatch
+
+
+class TxtExporter:
+    """Responsabilidade única: converter um RowBatch mapeado em TXT."""
+
+    def __init__(self, cnpj: str, codigo_filial: Optional[int]) -> None:
+        self._cnpj = cnpj
+        self._filial = str(codigo_filial or "")
+
+    def gerar_linhas(
+        self,
+        batch: RowBatch,
+        debitos: dict[int, Optional[str]],
+        creditos: dict[int, Optional[str]],
+    ) -> list[str]:
+        """Linhas 6000/6100 de todas as linhas do lote, na ordem do arquivo."""
+        linhas: list[str] = []
+        for idx in range(len(batch)):
+            valor_br = f"{batch.valores[idx]:.2f}".replace(".", ",")
+            historico = batch.textos[batch.historicos[idx]]
+            linhas.extend(
+                [
+                    "|6000|X||||",
+                    f"|6100|{batch.data_formatada(idx)}|{debitos[batch.debitos[idx]]}|{creditos[batch.creditos[idx]]}|{valor_br}||{historico}|VICTOR|{self._filial}||",
+                ]
+            )
+        return linhas
+
+    def gerar_base64(
+        self,
+        batch: RowBatch,
+        debitos: dict[int, Optional[str]],
+        creditos: dict[int, Optional[str]],
+    ) -> str:
+        """Arquivo completo (cabeçalho 0000 + lançamentos) em base64."""
+        cabecalho = f"|0000|{self._cnpj}|"
+        txt_final = "\n".join([cabecalho, *self.gerar_linhas(batch, debitos, creditos)])
+        return base64.b64encode(txt_final.encode()).decode()
+
+    def mesclar_base64(self, arquivos_base64: list[str]) -> str:
+        """Junta TXTs já gerados num único arquivo, com um só cabeçalho 0000."""
+        linhas = [f"|0000|{self._cnpj}|"]
+        for arquivo in arquivos_base64:
+            conteudo = base64.b64decode(arquivo).decode().split("\n")
+            linhas.extend(conteudo[1:])
+        return base64.b64encode("\n".join(linhas).encode()).decode()
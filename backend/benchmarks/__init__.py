@@ -0,0 +1 @@
+"""Ferramentas de medição (carga, inicialização) — não fazem parte da aplicação."""
@@ -0,0 +1,278 @@
+"""Orçamento de consultas SQL e verificação de plano por rota.
+
+Conta, via eventos do engine, quantos comandos SQL (e quantas linhas) cada
+rota emite sobre uma base com vários protocolos, e roda ``EXPLAIN QUERY PLAN``
+em cada consulta capturada. Falha (exit 1) se uma rota passar do orçamento ou
+se alguma consulta varrer uma tabela inteira (``SCAN tabela`` sem índice).
+
+Os orçamentos não dependem do volume da base: um N+1 estoura assim que houver
+mais protocolos/linhas do que o orçamento comporta. Tarefas de fundo
+(processamento do lote) rodam dentro da requisição no TestClient e entram na
+contagem da rota que as disparou.
+
+Uso (a partir de backend/; requer ``pip install httpx``):
+    python -m benchmarks.consultas
+    python -m benchmarks.consultas --protocolos 10 --verbose
+"""
+import argparse
+import base64
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+try:
+    import httpx  # noqa: F401 - requerido pelo TestClient
+except ImportError:  # pragma: no cover - dependência opcional
+    sys.exit("benchmarks.consultas requer httpx: pip install httpx")
+
+from benchmarks.planilha_sintetica import gerar_xlsx
+
+CNPJ = "99999999000191"
+LAYOUT = "layout_brastelha_1"
+# Tabelas pequenas por natureza: varredura é aceitável.
+_TABELAS_PEQUENAS = {"layoutexcel"}
+_SCAN = re.compile(r"^SCAN (\w+)(.*)$")
+
+
+@dataclass
+class Consulta:
+    sql: str
+    parametros: Any
+    linhas: int
+    varias: bool
+
+
+@dataclass
+class Medicao:
+    nome: str
+    consultas: list[Consulta] = field(default_factory=list)
+
+    @property
+    def linhas(self) -> int:
+        return sum(c.linhas for c in self.consultas)
+
+
+class ColetorConsultas:
+    """Registra os comandos enviados ao SQLite enquanto uma medição está ativa."""
+
+    def __init__(self, sync_engine) -> None:
+        from sqlalchemy import event
+
+        self._atual: Optional[Medicao] = None
+        event.listen(sync_engine, "after_cursor_execute", self._depois)
+
+    def _depois(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self._atual is None:
+            return
+        # O adaptador aiosqlite já trouxe as linhas do SELECT para ``_rows``.
+        linhas = len(getattr(cursor, "_rows", None) or ()) or max(cursor.rowcount or 0, 0)
+        self._atual.consultas.append(Consulta(statement, parameters, linhas, executemany))
+
+    @contextmanager
+    def medir(self, nome: str) -> Iterator[Medicao]:
+        self._atual = Medicao(nome)
+        try:
+            yield self._atual
+        finally:
+            self._atual = None
+
+
+def varreduras(db_path: str, consultas: list[Consulta]) -> list[tuple[str, str]]:
+    """(tabela, sql) de cada consulta cujo plano varre uma tabela sem índice."""
+    conn = sqlite3.connect(db_path)
+    try:
+        tabelas = {
+            nome for (nome,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        }
+        achados: list[tuple[str, str]] = []
+        vistos: set[str] = set()
+        for c in consultas:
+            sql = c.sql.strip()
+            if c.varias or sql in vistos or not re.match(r"(SELECT|UPDATE|DELETE)\b", sql, re.I):
+                continue
+            vistos.add(sql)
+            for *_, detalhe in conn.execute(f"EXPLAIN QUERY PLAN {sql}", c.parametros or ()):
+                m = _SCAN.match(detalhe)
+                if (
+                    m
+                    and m.group(1) in tabelas
+                    and m.group(1) not in _TABELAS_PEQUENAS
+                    and "INDEX" not in m.group(2)
+                ):
+                    achados.append((m.group(1), sql))
+        return achados
+    finally:
+        conn.close()
+
+
+@dataclass
+class Cenario:
+    nome: str
+    orcamento: int
+    executar: Callable[[Any, dict], Any]
+    # Consultas extras permitidas por protocolo reprocessado (um job cada).
+    por_job: int = 0
+
+
+def _corpo_lote(protocolo: str, arquivo: bytes) -> dict:
+    return {
+        "protocolo": protocolo,
+        "cnpj": CNPJ,
+        "codigo_matriz": 1,
+        "codigo_filial": 1,
+        "periodo": "2026-01",
+        "email_destinatario": "carga@example.com",
+        "layout_nome": LAYOUT,
+        "arquivo_base64": base64.b64encode(arquivo).decode(),
+    }
+
+
+def _checar(resposta) -> Any:
+    if resposta.status_code >= 400:
+        raise RuntimeError(f"{resposta.request.method} {resposta.request.url}: {resposta.text}")
+    return resposta.json()
+
+
+def _preparar(cliente, estado: dict, protocolos: int, linhas: int) -> None:
+    contas = [str(1000 + i) for i in range(40)]
+    pendentes = {"1000", "1001"}
+    csv_mapa = "conta_cliente;conta_contabilidade;tipo\n" + "".join(
+        f"{c};{int(c) + 50000};{tipo}\n"
+        for c in contas
+        if c not in pendentes
+        for tipo in ("DEBITO", "CREDITO")
+    )
+    _checar(
+        cliente.post(
+            "/api/mapeamentos/importar",
+            params={"cnpj": CNPJ},
+            files={"arquivo": ("mapa.csv", csv_mapa)},
+        )
+    )
+    for n in range(protocolos):
+        arquivo = gerar_xlsx(linhas, contas, seed=n)
+        _checar(cliente.post("/api/lancamento_lote_contabil", json=_corpo_lote(f"base-{n}", arquivo)))
+    estado["contas"] = contas
+    estado["arquivo"] = gerar_xlsx(linhas, contas, seed=999)
+    estado["pendencias"] = _checar(cliente.get("/api/pendencias"))["pendencias"]
+
+
+def _cenarios() -> list[Cenario]:
+    def upload(c, e):
+        return _checar(c.post("/api/lancamento_lote_contabil", json=_corpo_lote("novo", e["arquivo"])))
+
+    def resolver(c, e, conta: str, tipo: str):
+        p = e["pendencias"][0]
+        return _checar(
+            c.post(
+                "/api/pendencias/resolver",
+                json={
+                    "protocolo_id": p["protocolo_id"],
+                    "conta_cliente": conta,
+                    "conta_contabilidade": "77" + conta,
+                    "tipo": tipo,
+                    "cnpj_empresa": CNPJ,
+                },
+            )
+        )
+
+    return [
+        Cenario("upload + processamento", 14, upload),
+        Cenario("excluir protocolo", 8, lambda c, e: _checar(
+            c.delete("/api/lancamento_lote_contabil/novo"))),
+        Cenario("consultar protocolo", 3, lambda c, e: _checar(
+            c.get("/api/lancamento_lote_contabil", params={"protocolo": "base-0"}))),
+        Cenario("histórico por CNPJ", 2, lambda c, e: _checar(
+            c.get("/api/lancamento_lote_contabil", params={"cnpj": CNPJ}))),
+        Cenario("resumo", 3, lambda c, e: _checar(
+            c.get("/api/lancamento_lote_contabil/resumo", params={"protocolo": "base-0"}))),
+        Cenario("listar pendências", 3, lambda c, e: _checar(c.get("/api/pendencias"))),
+        Cenario("sugestões do protocolo", 4, lambda c, e: _checar(
+            c.get(f"/api/pendencias/{e['pendencias'][0]['protocolo_id']}/sugestoes"))),
+        Cenario("resolver (sem liberar)", 10, lambda c, e: resolver(c, e, "1000", "DEBITO")),
+        Cenario("resolver (libera todos)", 32, lambda c, e: [
+            resolver(c, e, conta, tipo)
+            for conta, tipo in (("1000", "CREDITO"), ("1001", "DEBITO"), ("1001", "CREDITO"))
+        ], por_job=8),
+    ]
+
+
+def executar(args: argparse.Namespace) -> dict:
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="consultas-"))
+    os.environ.setdefault("RETENCAO_ATIVA", "0")
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    from app.database import DB_PATH, engine
+    from app.main import app
+    from app.seed import seed
+    from app.services.sugestoes import indice_sugestoes
+
+    asyncio.run(seed())
+    coletor = ColetorConsultas(engine.sync_engine)
+    estado: dict = {}
+    relatorio: dict = {"cenarios": [], "falhas": []}
+    with TestClient(app) as cliente:
+        while not indice_sugestoes.pronto:
+            time.sleep(0.05)
+        _preparar(cliente, estado, args.protocolos, args.linhas)
+        for cenario in _cenarios():
+            with coletor.medir(cenario.nome) as medicao:
+                cenario.executar(cliente, estado)
+            scans = varreduras(str(DB_PATH), medicao.consultas)
+            orcamento = cenario.orcamento + cenario.por_job * args.protocolos
+            item = {
+                "cenario": cenario.nome,
+                "consultas": len(medicao.consultas),
+                "orcamento": orcamento,
+                "linhas": medicao.linhas,
+                "varreduras": [{"tabela": t, "sql": s} for t, s in scans],
+            }
+            relatorio["cenarios"].append(item)
+            if len(medicao.consultas) > orcamento:
+                relatorio["falhas"].append(
+                    f"{cenario.nome}: {len(medicao.consultas)} consultas (orçamento {orcamento})"
+                )
+            relatorio["falhas"] += [f"{cenario.nome}: SCAN {t}: {' '.join(s.split())}" for t, s in scans]
+            if args.verbose:
+                for c in medicao.consultas:
+                    print(f"    [{c.linhas:>5}] {' '.join(c.sql.split())[:160]}")
+    return relatorio
+
+
+def _imprimir(relatorio: dict) -> None:
+    print(f"{'cenário':<28}{'consultas':>10}{'orçamento':>11}{'linhas':>9}  varreduras")
+    for c in relatorio["cenarios"]:
+        tabelas = ",".join(sorted({v["tabela"] for v in c["varreduras"]})) or "-"
+        print(f"{c['cenario']:<28}{c['consultas']:>10}{c['orcamento']:>11}{c['linhas']:>9}  {tabelas}")
+    for falha in relatorio["falhas"]:
+        print(f"FALHA: {falha}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.consultas", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--protocolos", type=int, default=5, help="Protocolos WAITING_MAPPING na base")
+    parser.add_argument("--linhas", type=int, default=200, help="Linhas por planilha")
+    parser.add_argument("--verbose", action="store_true", help="Lista as consultas de cada cenário")
+    parser.add_argument("--json", help="Grava o relatório neste arquivo")
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args)
+    _imprimir(relatorio)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    return 1 if relatorio["falhas"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""Teste de carga do fluxo upload → pendência → resolução → download.
+
+Sem ``--url`` sobe a aplicação com uvicorn no próprio processo, num DATA_DIR
+temporário, e dispara usuários virtuais concorrentes contra ela. Com ``--url``
+mede um servidor já em execução (layout e CNPJ precisam existir).
+
+Uso (a partir de backend/; requer ``pip install httpx``):
+    python -m benchmarks.loadtest --usuarios 20 --duracao 30
+    python -m benchmarks.loadtest --url http://localhost:8111 --mix upload=1,status=4
+    python -m benchmarks.loadtest --max-p95-ms 500 --max-locked 0   # falha (exit 1) se exceder
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - dependência opcional
+    sys.exit("benchmarks.loadtest requer httpx: pip install httpx")
+
+from benchmarks.planilha_sintetica import gerar_xlsx
+
+CNPJ = "99999999000191"
+LAYOUT = "layout_brastelha_1"
+MIX_PADRAO = "upload=1,status=6,pendencias=1,resolver=1,historico=1"
+_LOCKED = "database is locked"
+
+
+def percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[idx]
+
+
+@dataclass
+class Metricas:
+    latencias: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    erros: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    locked: int = 0
+    jobs_inicio: dict[str, float] = field(default_factory=dict)
+    jobs_fim: dict[str, tuple[float, str]] = field(default_factory=dict)
+
+    def registrar(self, rota: str, segundos: float, resposta: "httpx.Response | None", erro: str = "") -> None:
+        self.latencias[rota].append(segundos * 1000)
+        if resposta is None or resposta.status_code >= 500:
+            self.erros[rota] += 1
+            texto = erro or (resposta.text if resposta is not None else "")
+            if _LOCKED in texto:
+                self.locked += 1
+
+    def relatorio(self, duracao: float) -> dict:
+        total = sum(len(v) for v in self.latencias.values())
+        conclusoes = [
+            (fim - self.jobs_inicio[p]) * 1000
+            for p, (fim, _) in self.jobs_fim.items()
+            if p in self.jobs_inicio
+        ]
+        status_jobs: dict[str, int] = defaultdict(int)
+        for _, status in self.jobs_fim.values():
+            status_jobs[status] += 1
+        return {
+            "duracao_s": round(duracao, 2),
+            "requisicoes": total,
+            "throughput_rps": round(total / duracao, 2) if duracao else 0,
+            "database_locked": self.locked,
+            "rotas": {
+                rota: {
+                    "n": len(v),
+                    "erros": self.erros[rota],
+                    "p50_ms": round(percentil(v, 50), 1),
+                    "p95_ms": round(percentil(v, 95), 1),
+                    "p99_ms": round(percentil(v, 99), 1),
+                }
+                for rota, v in sorted(self.latencias.items())
+            },
+            "jobs": {
+                "enviados": len(self.jobs_inicio),
+                "concluidos": len(self.jobs_fim),
+                "por_status": dict(status_jobs),
+                "conclusao_p50_ms": round(percentil(conclusoes, 50), 1),
+                "conclusao_p95_ms": round(percentil(conclusoes, 95), 1),
+                "conclusao_p99_ms": round(percentil(conclusoes, 99), 1),
+            },
+        }
+
+
+class UsuarioVirtual:
+    """Executa operações sorteadas pelo mix até o fim do teste."""
+
+    def __init__(self, cliente: "httpx.AsyncClient", metricas: Metricas, args: argparse.Namespace,
+                 contas: list[str], mix: list[tuple[str, int]], uid: int) -> None:
+        self._c = cliente
+        self._m = metricas
+        self._args = args
+        self._contas = contas
+        self._ops = [op for op, _ in mix]
+        self._pesos = [peso for _, peso in mix]
+        self._uid = uid
+        self._seq = 0
+        self._meus: list[str] = []
+        self._ultimas_pendencias: list[dict] = []
+
+    async def executar(self, fim: float) -> None:
+        while time.monotonic() < fim:
+            op = random.choices(self._ops, self._pesos)[0]
+            if op != "upload" and not self._meus:
+                op = "upload"
+            await getattr(self, f"_{op}")()
+
+    async def _req(self, rota: str, metodo: str, url: str, **kwargs) -> "httpx.Response | None":
+        inicio = time.perf_counter()
+        try:
+            resposta = await self._c.request(metodo, url, **kwargs)
+        except Exception as e:  # noqa: BLE001 - toda falha conta como erro da rota
+            self._m.registrar(rota, time.perf_counter() - inicio, None, str(e))
+            return None
+        self._m.registrar(rota, time.perf_counter() - inicio, resposta)
+        return resposta
+
+    async def _upload(self) -> None:
+        self._seq += 1
+        numero = f"lt-{os.getpid()}-{self._uid}-{self._seq}-{random.randrange(10**6)}"
+        xlsx = gerar_xlsx(self._args.linhas, self._contas, self._args.periodo)
+        corpo = {
+            "protocolo": numero,
+            "cnpj": CNPJ,
+            "codigo_matriz": 1,
+            "codigo_filial": 1,
+            "periodo": self._args.periodo,
+            "email_destinatario": "carga@example.com",
+            "layout_nome": LAYOUT,
+            "arquivo_base64": base64.b64encode(xlsx).decode(),
+        }
+        self._m.jobs_inicio[numero] = time.monotonic()
+        r = await self._req("POST /lancamento_lote_contabil", "POST", "/api/lancamento_lote_contabil", json=corpo)
+        if r is not None and r.status_code == 200:
+            self._meus.append(numero)
+        else:
+            self._m.jobs_inicio.pop(numero, None)
+
+    async def _status(self) -> None:
+        abertos = [p for p in self._meus if p not in self._m.jobs_fim]
+        if not abertos:
+            return await self._historico()
+        numero = random.choice(abertos)
+        r = await self._req("GET /lancamento_lote_contabil?protocolo", "GET", "/api/lancamento_lote_contabil",
+                            params={"protocolo": numero})
+        if r is None or r.status_code != 200:
+            return
+        dados = r.json()
+        if dados["status"] != "PENDING":
+            self._m.jobs_fim[numero] = (time.monotonic(), dados["status"])
+            if _LOCKED in (dados.get("error_message") or ""):
+                self._m.locked += 1
+
+    async def _pendencias(self) -> None:
+        r = await self._req("GET /pendencias", "GET", "/api/pendencias")
+        if r is not None and r.status_code == 200:
+            self._ultimas_pendencias = r.json()["pendencias"]
+
+    async def _resolver(self) -> None:
+        if not self._ultimas_pendencias:
+            return await self._pendencias()
+        proto = random.choice(self._ultimas_pendencias)
+        if not proto["entries"]:
+            return
+        entry = random.choice(proto["entries"])
+        tipo, conta = random.choice(
+            [("DEBITO", entry["conta_debito_raw"]), ("CREDITO", entry["conta_credito_raw"])]
+        )
+        await self._req("POST /pendencias/resolver", "POST", "/api/pendencias/resolver", json={
+            "protocolo_id": proto["protocolo_id"],
+            "conta_cliente": conta,
+            "conta_contabilidade": f"9.{conta}",
+            "tipo": tipo,
+            "cnpj_empresa": proto["cnpj"],
+        })
+
+    async def _historico(self) -> None:
+        await self._req("GET /lancamento_lote_contabil?cnpj", "GET", "/api/lancamento_lote_contabil",
+                        params={"cnpj": CNPJ})
+
+
+async def _preparar(cliente: "httpx.AsyncClient", contas: list[str], fracao: float) -> None:
+    """Pré-mapeia parte das contas para gerar uma proporção de WAITING_MAPPING."""
+    mapeadas = contas[: int(len(contas) * fracao)]
+    linhas = ["conta_cliente;conta_contabilidade;tipo"]
+    linhas += [f"{c};1.{c};{t}" for c in mapeadas for t in ("DEBITO", "CREDITO")]
+    r = await cliente.post(
+        "/api/mapeamentos/importar",
+        params={"cnpj": CNPJ},
+        files={"arquivo": ("carga.csv", "\n".join(linhas).encode())},
+    )
+    r.raise_for_status()
+
+
+async def _esperar_servidor(url: str, timeout: float = 30) -> None:
+    limite = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as c:
+        while True:
+            try:
+                await c.get("/api/lancamento_lote_contabil", params={"cnpj": CNPJ})
+                return
+            except httpx.TransportError:
+                if time.monotonic() > limite:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def _servidor_local() -> tuple[str, "asyncio.Task", object]:
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="loadtest-"))
+    os.environ.setdefault("RETENCAO_ATIVA", "0")
+    import uvicorn
+
+    from app.main import app
+    from app.seed import seed
+
+    await seed()
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        porta = s.getsockname()[1]
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=porta, log_level="warning"))
+    tarefa = asyncio.create_task(servidor.serve())
+    url = f"http://127.0.0.1:{porta}"
+    await _esperar_servidor(url)
+    return url, tarefa, servidor
+
+
+async def executar(args: argparse.Namespace) -> dict:
+    mix = [(op, int(peso)) for op, peso in (p.split("=") for p in args.mix.split(","))]
+    contas = [str(1000 + i) for i in range(args.contas)]
+    tarefa = servidor = None
+    url = args.url
+    if not url:
+        url, tarefa, servidor = await _servidor_local()
+
+    metricas = Metricas()
+    try:
+        limites = httpx.Limits(max_connections=args.usuarios)
+        async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limites) as cliente:
+            await _preparar(cliente, contas, args.mapeadas)
+            inicio = time.monotonic()
+            fim = inicio + args.duracao
+            usuarios = [UsuarioVirtual(cliente, metricas, args, contas, mix, i) for i in range(args.usuarios)]
+            await asyncio.gather(*(u.executar(fim) for u in usuarios))
+            duracao = time.monotonic() - inicio
+    finally:
+        if servidor is not None:
+            servidor.should_exit = True
+            await tarefa
+    return metricas.relatorio(duracao)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Servidor alvo; sem isso sobe uvicorn em processo")
+    parser.add_argument("--usuarios", type=int, default=10, help="Usuários virtuais concorrentes")
+    parser.add_argument("--duracao", type=float, default=20, help="Segundos de carga")
+    parser.add_argument("--mix", default=MIX_PADRAO, help=f"Pesos das operações (padrão: {MIX_PADRAO})")
+    parser.add_argument("--linhas", type=int, default=500, help="Linhas por planilha sintética")
+    parser.add_argument("--contas", type=int, default=200, help="Contas distintas nas planilhas")
+    parser.add_argument("--mapeadas", type=float, default=0.95, help="Fração de contas pré-mapeadas")
+    parser.add_argument("--periodo", default="2026-01")
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout por requisição (s)")
+    parser.add_argument("--json", help="Grava o relatório neste arquivo")
+    parser.add_argument("--max-p95-ms", type=float, help="Falha se alguma rota exceder este p95")
+    parser.add_argument("--max-locked", type=int, help="Falha se houver mais erros 'database is locked'")
+    args = parser.parse_args(argv)
+
+    relatorio = asyncio.run(executar(args))
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(texto)
+
+    falhas = []
+    if args.max_p95_ms is not None:
+        falhas += [
+            f"{rota}: p95 {m['p95_ms']}ms > {args.max_p95_ms}ms"
+            for rota, m in relatorio["rotas"].items()
+            if m["p95_ms"] > args.max_p95_ms
+        ]
+    if args.max_locked is not None and relatorio["database_locked"] > args.max_locked:
+        falhas.append(f"database is locked: {relatorio['database_locked']} > {args.max_locked}")
+    for falha in falhas:
+        print(f"❌ {falha}", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
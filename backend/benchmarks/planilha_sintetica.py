@@ -0,0 +1,115 @@
+"""Gera XLSX mínimos no layout_brastelha_1 sem depender de bibliotecas externas."""
+import io
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+{planilhas}
+</Types>"""
+_CONTENT_TYPE_PLANILHA = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>{planilhas}</sheets>
+</workbook>"""
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+{planilhas}
+</Relationships>"""
+_REL_PLANILHA = (
+    '<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/'
+    '2006/relationships/worksheet" Target="worksheets/sheet{n}.xml"/>'
+)
+
+# Colunas do layout_brastelha_1: E=data, F=dia, G=débito, H=crédito, L=valor, N=cód., O=histórico.
+# A coluna A é sempre preenchida: o calamine descarta colunas vazias à esquerda.
+_CABECALHO = [
+    "Unidade", "", "", "", "Data mes_ano", "V_Dia Lancamento", "V_Conta Debito",
+    "V_Conta Credito", "", "", "", "Valor", "", "Codigo Historico", "Historico compl",
+]
+
+
+def _celula(ref: str, valor) -> str:
+    if isinstance(valor, (int, float)):
+        return f'<c r="{ref}"><v>{valor}</v></c>'
+    return f'<c r="{ref}" t="inlineStr"><is><t>{escape(str(valor))}</t></is></c>'
+
+
+def _linha_xml(num: int, valores: list) -> str:
+    celulas = "".join(
+        _celula(f"{chr(ord('A') + i)}{num}", v) for i, v in enumerate(valores) if v != ""
+    )
+    return f'<row r="{num}">{celulas}</row>'
+
+
+def gerar_xlsx(
+    linhas: int,
+    contas: list[str],
+    periodo: str = "2026-01",
+    seed: int | None = None,
+    abas: int = 1,
+) -> bytes:
+    """XLSX com ``linhas`` lançamentos aleatórios entre ``contas`` no período.
+
+    Com ``abas`` > 1, cada aba ("Plan1", "Plan2", ...) recebe ``linhas`` lançamentos.
+    """
+    rnd = random.Random(seed)
+    buffer = io.BytesIO()
+    numeros = range(1, abas + 1)
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(
+            "[Content_Types].xml",
+            _CONTENT_TYPES.format(
+                planilhas="".join(_CONTENT_TYPE_PLANILHA.format(n=n) for n in numeros)
+            ),
+        )
+        zf.writestr("_rels/.rels", _RELS)
+        zf.writestr(
+            "xl/workbook.xml",
+            _WORKBOOK.format(
+                planilhas="".join(
+                    f'<sheet name="Plan{n}" sheetId="{n}" r:id="rId{n}"/>' for n in numeros
+                )
+            ),
+        )
+        zf.writestr(
+            "xl/_rels/workbook.xml.rels",
+            _WORKBOOK_RELS.format(planilhas="".join(_REL_PLANILHA.format(n=n) for n in numeros)),
+        )
+        for n in numeros:
+            zf.writestr(f"xl/worksheets/sheet{n}.xml", _planilha_xml(rnd, linhas, contas, periodo))
+    return buffer.getvalue()
+
+
+def _planilha_xml(rnd: random.Random, linhas: int, contas: list[str], periodo: str) -> str:
+    ano, mes = periodo.split("-")
+    corpo = [_linha_xml(1, _CABECALHO)]
+    for n in range(2, linhas + 2):
+        debito, credito = rnd.sample(contas, 2) if len(contas) > 1 else (contas[0],) * 2
+        corpo.append(
+            _linha_xml(
+                n,
+                [
+                    "001", "", "", "", f"{ano}-{mes}-01", rnd.randint(1, 28),
+                    int(debito), int(credito), "", "", "",
+                    round(rnd.uniform(1, 50000), 2), "", rnd.randint(100, 400),
+                    f"LANCAMENTO SINTETICO {n}",
+                ],
+            )
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'<sheetData>{"".join(corpo)}</sheetData></worksheet>'
+    )
@@ -0,0 +1,171 @@
+"""Tempo de partida: custo de import e tempo até a primeira resposta.
+
+Mede, em subprocessos novos (como um restart do container):
+
+* ``python -X importtime -c "import app.main"``: total de import, parcela do
+  código ``app.*`` e os módulos mais caros; falha se algum módulo que deveria
+  ser carregado só no primeiro uso (``_ADIADOS``) aparecer na partida;
+* uvicorn até a primeira resposta 200 de ``/api/pendencias``, com banco novo
+  (cria o esquema) e com o banco já no esquema atual (caminho de todo boot).
+
+Sai com código 1 se algum orçamento for estourado.
+
+Uso (a partir de backend/):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --max-import-ms 1200 --max-resposta-ms 2500 --json startup.json
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# Carregados no primeiro upload/processamento, nunca na partida.
+_ADIADOS = ("python_calamine", "app.services.lote_processor")
+_LINHA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def _ambiente(data_dir: str) -> dict:
+    return {**os.environ, "DATA_DIR": data_dir, "RETENCAO_ATIVA": "0"}
+
+
+def medir_import(modulo: str = "app.main", repeticoes: int = 3, top: int = 8) -> dict:
+    """Mediana de ``repeticoes`` execuções de ``-X importtime`` (a 1ª aquece os .pyc)."""
+    execucoes = []
+    with tempfile.TemporaryDirectory(prefix="startup-") as data_dir:
+        for _ in range(repeticoes + 1):
+            saida = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                cwd=BACKEND_DIR,
+                env=_ambiente(data_dir),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stderr
+            proprio: dict[str, int] = {}
+            filhos: dict[str, int] = {}
+            pendentes: dict[str, int] = {}
+            for linha in saida.splitlines():
+                m = _LINHA.match(linha)
+                if not m:
+                    continue
+                proprio[m.group(4)] = int(m.group(1))
+                # importtime lista os filhos (um nível de recuo) antes do pai.
+                if len(m.group(3)) == 2:
+                    pendentes[m.group(4)] = int(m.group(2))
+                elif not m.group(3):
+                    if m.group(4) == modulo:
+                        filhos = pendentes
+                    pendentes = {}
+            execucoes.append((proprio, filhos))
+    execucoes = execucoes[1:]
+    total = statistics.median(sum(p.values()) for p, _ in execucoes) / 1000
+    app = statistics.median(
+        sum(us for nome, us in p.items() if nome == "app" or nome.startswith("app.")) for p, _ in execucoes
+    ) / 1000
+    proprio, filhos = execucoes[-1]
+    return {
+        "total_ms": round(total, 1),
+        "app_ms": round(app, 1),
+        "mais_caros": [
+            {"modulo": nome, "ms": round(us / 1000, 1)}
+            for nome, us in sorted(filhos.items(), key=lambda kv: -kv[1])[:top]
+        ],
+        "carregados_cedo": [m for m in _ADIADOS if m in proprio],
+    }
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir_primeira_resposta(data_dir: str, timeout_s: float = 30.0) -> float:
+    """ms entre o lançamento do uvicorn e o primeiro 200 em /api/pendencias."""
+    porta = _porta_livre()
+    url = f"http://127.0.0.1:{porta}/api/pendencias"
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=_ambiente(data_dir),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - inicio < timeout_s:
+            if processo.poll() is not None:
+                raise RuntimeError(f"uvicorn terminou com código {processo.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resposta:
+                    if resposta.status == 200:
+                        return round((time.perf_counter() - inicio) * 1000, 1)
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError(f"sem resposta de {url} em {timeout_s}s")
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def executar(args: argparse.Namespace) -> dict:
+    relatorio: dict = {"import": medir_import(repeticoes=args.repeticoes), "falhas": []}
+    with tempfile.TemporaryDirectory(prefix="startup-") as data_dir:
+        relatorio["primeira_resposta_ms"] = {
+            "banco_novo": medir_primeira_resposta(data_dir),
+            "banco_atual": statistics.median(
+                medir_primeira_resposta(data_dir) for _ in range(args.repeticoes)
+            ),
+        }
+
+    imp = relatorio["import"]
+    if imp["total_ms"] > args.max_import_ms:
+        relatorio["falhas"].append(f"import app.main: {imp['total_ms']} ms (orçamento {args.max_import_ms})")
+    relatorio["falhas"] += [f"{m} importado na partida" for m in imp["carregados_cedo"]]
+    for caso, ms in relatorio["primeira_resposta_ms"].items():
+        if ms > args.max_resposta_ms:
+            relatorio["falhas"].append(f"primeira resposta ({caso}): {ms} ms (orçamento {args.max_resposta_ms})")
+    return relatorio
+
+
+def _imprimir(relatorio: dict) -> None:
+    imp = relatorio["import"]
+    print(f"import app.main: {imp['total_ms']} ms (código app.*: {imp['app_ms']} ms)")
+    for m in imp["mais_caros"]:
+        print(f"    {m['ms']:>8} ms  {m['modulo']}")
+    for caso, ms in relatorio["primeira_resposta_ms"].items():
+        print(f"primeira resposta ({caso}): {ms} ms")
+    for falha in relatorio["falhas"]:
+        print(f"FALHA: {falha}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-import-ms", type=float, default=1500, help="Orçamento do import de app.main")
+    parser.add_argument("--max-resposta-ms", type=float, default=3000,
+                        help="Orçamento até a primeira resposta (por caso)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por medição (mediana)")
+    parser.add_argument("--json", help="Grava o relatório neste arquivo")
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args)
+    _imprimir(relatorio)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    return 1 if relatorio["falhas"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
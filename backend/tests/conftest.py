@@ -0,0 +1,39 @@
+"""Ambiente isolado para os testes: banco e arquivo morto num diretório temporário."""
+import asyncio
+import os
+import tempfile
+
+# Precisa vir antes de qualquer import de app.* (DATA_DIR é lido no import).
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="testes-")
+os.environ["RETENCAO_ATIVA"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.seed import seed
+
+
+@pytest.fixture(scope="session")
+def client():
+    asyncio.run(seed())
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def corpo():
+    """Payload de preflight/upload no layout padrão; campos extras por kwargs."""
+
+    def _corpo(arquivo_base64: str, **extras) -> dict:
+        return {
+            "cnpj": "99999999000191",
+            "codigo_matriz": 1,
+            "email_destinatario": "contabil@example.com",
+            "periodo": "2026-01",
+            "layout_nome": "layout_brastelha_1",
+            "arquivo_base64": arquivo_base64,
+            **extras,
+        }
+
+    return _corpo
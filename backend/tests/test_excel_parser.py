@@ -0,0 +1,60 @@
+"""Leitura de CSV: a convenção decimal vale para a coluna inteira."""
+import base64
+
+import pytest
+
+from app.core.exceptions import FormatoArquivoInvalidoError
+from app.models.layout_excel import LayoutExcel
+from app.models.layout_excel_csv import LayoutExcelCsv
+from app.services.excel_parser import ExcelParser, OpcoesCsv
+
+LAYOUT = LayoutExcel(
+    nome="teste",
+    col_data="E",
+    col_valor="L",
+    col_historico="O",
+    col_cod_historico="N",
+    col_conta_debito="G",
+    col_conta_credito="H",
+)
+CABECALHO = ";;;;E;F;G;H;;;;L;;N;O"
+
+
+def _csv(*valores: str) -> str:
+    linhas = [CABECALHO] + [f"001;;;;2026-01-01;3;1;2;;;;{v};;100;HIST" for v in valores]
+    return base64.b64encode("\n".join(linhas).encode()).decode()
+
+
+def _valores(arquivo: str, opcoes: OpcoesCsv | None = None) -> list[float]:
+    batch = ExcelParser(LAYOUT, opcoes or OpcoesCsv()).parsear(arquivo)
+    return list(batch.valores)
+
+
+@pytest.mark.parametrize(
+    "valores, esperado",
+    [
+        (["1.500", "1.500,00", "12.345.678"], [1500.0, 1500.0, 12345678.0]),
+        (["1,500", "1,234.56"], [1500.0, 1234.56]),
+        (["10,5", "2.750"], [10.5, 2750.0]),
+        (["0.500", "2,750"], [0.5, 2750.0]),
+        (["100", "1.500", "7"], None),
+    ],
+)
+def test_convencao_decidida_para_a_coluna(valores, esperado):
+    if esperado is None:
+        with pytest.raises(FormatoArquivoInvalidoError, match="1.500"):
+            _valores(_csv(*valores))
+    else:
+        assert _valores(_csv(*valores)) == esperado
+
+
+def test_convencao_do_layout_dispensa_deteccao():
+    opcoes = OpcoesCsv.do_layout(LayoutExcelCsv(layout_id=1, decimal_virgula=False))
+    assert _valores(_csv("1.500", "2,750"), opcoes) == [1.5, 2750.0]
+
+
+def test_layout_sobrepoe_ambiente(monkeypatch):
+    monkeypatch.setenv("CSV_DECIMAL_VIRGULA", "1")
+    monkeypatch.setenv("CSV_ENCODING", "cp1252")
+    opcoes = OpcoesCsv.do_layout(LayoutExcelCsv(layout_id=1, decimal_virgula=False))
+    assert (opcoes.decimal_virgula, opcoes.encoding) == (False, "cp1252")
@@ -0,0 +1,54 @@
+"""Processamento de lotes e envios pela API."""
+import base64
+import json
+
+from benchmarks.planilha_sintetica import gerar_xlsx
+
+
+def test_resumo_de_protocolo_recusado_por_periodo(client, corpo):
+    xlsx = gerar_xlsx(20, ["1000", "1001"], periodo="2025-12", seed=1)
+    r = client.post(
+        "/api/lancamento_lote_contabil",
+        json=corpo(base64.b64encode(xlsx).decode(), protocolo="T-RESUMO-ERRO"),
+    )
+    assert r.status_code == 200
+    status = client.get("/api/lancamento_lote_contabil", params={"protocolo": "T-RESUMO-ERRO"})
+    assert status.json()["status"] == "ERROR"
+
+    resumo = client.get("/api/lancamento_lote_contabil/resumo", params={"protocolo": "T-RESUMO-ERRO"})
+    assert resumo.status_code == 200
+    assert resumo.json()["linhas"] == 20
+
+
+def test_envio_excluido_por_inteiro_e_reenviado(client):
+    csv = b";;;;E;F;G;H;;;;L;;N;O\n001;;;;2025-12-01;3;1;2;;;;10,5;;100;HIST\n"
+    manifesto = {
+        "envio": "T-ENVIO",
+        "cnpj": "99999999000191",
+        "codigo_matriz": 1,
+        "periodo": "2026-01",
+        "email_destinatario": "contabil@example.com",
+        "layout_nome": "layout_brastelha_1",
+        "arquivos": [
+            {"arquivo": "a.csv", "protocolo": "T-ENVIO-1"},
+            {"arquivo": "b.csv", "protocolo": "T-ENVIO-2"},
+        ],
+    }
+
+    def enviar():
+        return client.post(
+            "/api/lancamento_lote_contabil/envio",
+            data={"manifesto": json.dumps(manifesto)},
+            files=[("arquivos", ("a.csv", csv)), ("arquivos", ("b.csv", csv))],
+        )
+
+    assert enviar().status_code == 200
+    assert client.get("/api/lancamento_lote_contabil/envio/T-ENVIO").json()["status"] == "ERROR"
+    assert client.delete("/api/lancamento_lote_contabil/T-ENVIO-1").status_code == 409
+
+    r = client.delete("/api/lancamento_lote_contabil/envio/T-ENVIO")
+    assert r.json()["protocolos"] == ["T-ENVIO-1", "T-ENVIO-2"]
+    assert client.get("/api/lancamento_lote_contabil/envio/T-ENVIO").status_code == 404
+    assert client.get("/api/lancamento_lote_contabil", params={"protocolo": "T-ENVIO-1"}).status_code == 404
+    assert client.delete("/api/lancamento_lote_contabil/envio/T-ENVIO").status_code == 404
+    assert enviar().status_code == 200
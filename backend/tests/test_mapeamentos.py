@@ -0,0 +1,97 @@
+"""Mapeamentos: uma linha por (cnpj, tipo, conta), mesmo com gravações concorrentes."""
+import asyncio
+import io
+from datetime import datetime
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database import engine, init_db
+from app.models.account_mapping import AccountMapping
+from app.repositories.account_mapping_repository import AccountMappingRepository
+from app.services.mapeamento_io import MapeamentoImporter, ler_planilha_mapeamento
+
+Sessao = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def _rodar(coro):
+    async def _com_dispose():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()  # conexões presas a este event loop
+
+    return asyncio.run(_com_dispose())
+
+
+async def _linhas(cnpj: str) -> list[tuple[str, str, str]]:
+    async with Sessao() as db:
+        resultado = await db.execute(
+            select(AccountMapping.tipo, AccountMapping.conta_cliente, AccountMapping.conta_contabilidade)
+            .where(AccountMapping.cnpj_empresa == cnpj)
+            .order_by(AccountMapping.tipo, AccountMapping.conta_cliente)
+        )
+        return [tuple(r) for r in resultado]
+
+
+async def _importar(cnpj: str, conteudo: str):
+    async with Sessao() as db:
+        linhas = ler_planilha_mapeamento(io.BytesIO(conteudo.encode()), "utf-8")
+        return await MapeamentoImporter(db).importar(cnpj, linhas)
+
+
+def test_importacao_atualiza_sem_duplicar(client):
+    cnpj = "11111111000111"
+    cabecalho = "conta_cliente;conta_contabilidade;tipo\n"
+
+    async def cenario():
+        await _importar(cnpj, cabecalho + "10;100;DEBITO\n20;200;CREDITO\n")
+        async with Sessao() as db:
+            await AccountMappingRepository(db).salvar_ou_atualizar(cnpj, "10", "150", "DEBITO")
+        relatorio = await _importar(cnpj, cabecalho + "10;101;DEBITO\n20;200;CREDITO\n")
+        return relatorio, await _linhas(cnpj)
+
+    relatorio, linhas = _rodar(cenario())
+    assert relatorio.inalterados == 1
+    assert linhas == [("CREDITO", "20", "200"), ("DEBITO", "10", "101")]
+
+
+def test_gravacoes_concorrentes_da_mesma_conta(client):
+    cnpj = "22222222000122"
+
+    async def gravar(destino: str):
+        async with Sessao() as db:
+            await AccountMappingRepository(db).salvar_ou_atualizar(cnpj, "30", destino, "DEBITO")
+
+    async def cenario():
+        await asyncio.gather(*(gravar(str(300 + i)) for i in range(5)))
+        return await _linhas(cnpj)
+
+    linhas = _rodar(cenario())
+    assert len(linhas) == 1
+
+
+def test_migracao_remove_duplicatas_antes_do_indice_unico(client):
+    cnpj = "33333333000133"
+
+    async def cenario():
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP INDEX ux_accountmapping_cnpj_tipo_conta"))
+            await conn.execute(
+                AccountMapping.__table__.insert(),
+                [
+                    {"cnpj_empresa": cnpj, "conta_cliente": "40", "conta_contabilidade": destino,
+                     "tipo": "DEBITO", "last_used": datetime(2026, 1, dia)}
+                    for destino, dia in (("400", 5), ("401", 9), ("402", 7))
+                ],
+            )
+            await conn.execute(text("PRAGMA user_version=0"))
+        assert await init_db()
+        async with engine.connect() as conn:
+            indices = (await conn.execute(text("PRAGMA index_list(accountmapping)"))).all()
+        return await _linhas(cnpj), {i[1] for i in indices if i[2]}
+
+    linhas, unicos = _rodar(cenario())
+    assert linhas == [("DEBITO", "40", "401")]
+    assert "ux_accountmapping_cnpj_tipo_conta" in unicos
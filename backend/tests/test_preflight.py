@@ -0,0 +1,34 @@
+"""Preflight: arquivo ilegível vira 400, nunca 500."""
+import base64
+
+import pytest
+
+from benchmarks.planilha_sintetica import gerar_xlsx
+
+URL = "/api/lancamento_lote_contabil/preflight"
+
+
+@pytest.mark.parametrize("arquivo", ["@@@", "abc", "é", "data:text/csv;base64,ção"])
+def test_arquivo_ilegivel_responde_400(client, corpo, arquivo):
+    r = client.post(URL, json=corpo(arquivo))
+    assert r.status_code == 400
+
+
+def test_base64_nao_ascii_explica_o_erro(client, corpo):
+    r = client.post(URL, json=corpo("é"))
+    assert "Base64 inválido" in r.json()["detail"]
+
+
+def test_base64_invalido_no_upload_com_validar_antes(client, corpo):
+    r = client.post(
+        "/api/lancamento_lote_contabil",
+        json=corpo("é", protocolo="T-B64", validar_antes=True),
+    )
+    assert r.status_code == 400
+
+
+def test_planilha_valida_passa(client, corpo):
+    xlsx = gerar_xlsx(10, ["1000", "1001"], seed=1)
+    r = client.post(URL, json=corpo(base64.b64encode(xlsx).decode()))
+    assert r.status_code == 200
+    assert r.json()["valido"] and r.json()["completo"]
@@ -0,0 +1,57 @@
+"""Arquivo morto: leitura e remoção no mesmo diretório usado na gravação."""
+import asyncio
+import base64
+import time
+import zipfile
+from datetime import datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database import engine
+from app.models.protocolo import Protocolo
+from app.services.retencao import PoliticaRetencao, ResultadoRetencao, RetencaoService
+from benchmarks.planilha_sintetica import gerar_xlsx
+
+Sessao = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+CSV = b";;;;E;F;G;H;;;;L;;N;O\n001;;;;2026-01-01;3;1;2;;;;10,5;;100;HIST\n"
+
+
+@pytest.mark.parametrize("bruto, nome", [(CSV, "original.csv"), (gerar_xlsx(1, ["1", "2"]), "original.xlsx")])
+def test_arquivo_morto_em_diretorio_proprio(client, tmp_path, bruto, nome):
+    txt = base64.b64encode(b"cabecalho\nlinha").decode()
+
+    async def cenario():
+        try:
+            async with Sessao() as db:
+                protocolo = Protocolo(
+                    numero_protocolo=f"RET-{nome}",
+                    cnpj="44444444000144",
+                    periodo="2026-01",
+                    status="COMPLETED",
+                    arquivo_base64_raw=base64.b64encode(bruto).decode(),
+                    arquivo_txt_base64=txt,
+                    created_at=datetime(2020, 1, 1),
+                )
+                db.add(protocolo)
+                await db.commit()
+                servico = RetencaoService(
+                    db, PoliticaRetencao(dias_por_status={"COMPLETED": 1}), archive_dir=tmp_path
+                )
+                await servico.arquivar(time.monotonic() + 5, ResultadoRetencao())
+                await db.refresh(protocolo)
+                zips = list(tmp_path.rglob("*.zip"))
+                with zipfile.ZipFile(zips[0]) as zf:
+                    nomes = sorted(zf.namelist())
+                lido = await servico.carregar_txt(protocolo)
+                await servico.remover_arquivo(protocolo.id)
+                return protocolo.arquivo_txt_base64, nomes, lido, list(tmp_path.rglob("*.zip"))
+        finally:
+            await engine.dispose()
+
+    no_banco, nomes, lido, restantes = asyncio.run(cenario())
+    assert no_banco is None
+    assert nomes == sorted([nome, "resultado.txt"])
+    assert lido == txt
+    assert restantes == []
@@ -176,12 +176,12 @@ export function LoteForm({ onSuccess }: LoteFormProps) {
                 className="flex cursor-pointer items-center gap-2 rounded-md border border-dashed px-4 py-2 text-sm text-muted-foreground hover:border-primary hover:text-primary transition-colors"
               >
                 <Upload className="h-4 w-4" />
-                {file ? file.name : "Selecionar arquivo .xlsx"}
+                {file ? file.name : "Selecionar arquivo .xlsx, .ods ou .csv"}
               </label>
               <input
                 id="arquivo"
                 type="file"
-                accept=".xlsx,.xls"
+                accept=".xlsx,.xls,.xlsb,.ods,.csv"
                 className="hidden"
                 onChange={(e) => setFile(e.target.files?.[0] ?? null)}
               />